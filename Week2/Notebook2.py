@@ -9,8 +9,60 @@ def _():
     import marimo as mo
     import numpy as np
     import itertools as itertools
-    import pandas as pd
-    return itertools, mo, np, pd
+    from startup import deferred
+    from streaming_stats import describe
+    from chunked import ChunkedStream
+    from pipeline import Pipeline
+    from datasets import load_cars
+    from columns import Query, Records
+    from sources import ColumnFile
+    from growable import GrowableArray
+    from tensors import random_tensor
+    from blocked import blocked_reduce
+    from cardinality import cardinality as fast_cardinality
+    from sketches import HyperLogLog
+    from setbuilder import set_builder
+    from sequences import ArithmeticSequence
+    from series import infinite_sum
+    from families import PowerFamily
+    from translation import TranslationTable
+    from frozen import CopyOnWrite, track_copies
+    from windows import diff as window_diff, rolling
+    from async_streams import AsyncChunkedStream, fan_in, replay
+    from incremental import IncrementalView
+    from cache import cached
+    return (
+        ArithmeticSequence,
+        AsyncChunkedStream,
+        ChunkedStream,
+        ColumnFile,
+        CopyOnWrite,
+        GrowableArray,
+        HyperLogLog,
+        IncrementalView,
+        Pipeline,
+        PowerFamily,
+        Query,
+        Records,
+        TranslationTable,
+        blocked_reduce,
+        cached,
+        deferred,
+        describe,
+        fan_in,
+        fast_cardinality,
+        infinite_sum,
+        itertools,
+        load_cars,
+        mo,
+        np,
+        random_tensor,
+        replay,
+        rolling,
+        set_builder,
+        track_copies,
+        window_diff,
+    )
 
 
 @app.cell(hide_code=True)
@@ -68,13 +120,13 @@ def _(S):
 @app.cell(hide_code=True)
 def _(mo):
     mo.callout(mo.md(r"""### Notation for iteration in mathematics
-                     In mathematics, we also have to formulate operations on collections of things. For instance:
-    	$$\sum_{x \in S} x^2$$
-    	is the mathematical expression equivalent to `sum(iter)`:
+    In mathematics, we also have to formulate operations on collections of things. For instance:
+    $$\sum_{x \in S} x^2$$
+    is the mathematical expression equivalent to `sum(iter)`:
 
-    	- The $\sum$ symbol means `sum over`.
+    - The $\sum$ symbol means `sum over`.
 
-    	- The subscript $x \in S$ denotes the elements to sum over. In this case, we iteratively take each element in $S$, call it $x$, and add $x^2$ to our running total. """),kind="info" )
+    - The subscript $x \in S$ denotes the elements to sum over. In this case, we iteratively take each element in $S$, call it $x$, and add $x^2$ to our running total. """),kind="info" )
     return
 
 
@@ -105,7 +157,7 @@ def _(mo):
 @app.cell(hide_code=True)
 def _(mo):
     mo.accordion({"### Questions" : r"""
-    	- Fill in the `cardinality`  function below. It should return the number of elements in any set given as input.
+    - Fill in the `cardinality`  function below. It should return the number of elements in any set given as input.
         - Ideally, make it one line of code that uses the `sum` function!
         """})
     return
@@ -126,6 +178,14 @@ def _(mo):
     return
 
 
+@app.cell
+def _(S, fast_cardinality):
+    # sum(1 for el in some_set) visits every element, but a set (or a range) already knows its size.
+    # fast_cardinality (see cardinality.py) only walks the elements when nothing cheaper is available
+    (fast_cardinality(S), fast_cardinality(range(10**12)), fast_cardinality(x for x in S if x > 1))
+    return
+
+
 @app.cell(hide_code=True)
 def _(mo):
     mo.md(
@@ -146,6 +206,22 @@ def _(S):
     return
 
 
+@app.cell
+def _(HyperLogLog, S):
+    # how many elements does conditional_iter have, without building the set? For a huge S, a HyperLogLog sketch
+    # (see sketches.py) estimates the number of distinct values in a few KB of memory, however many there are
+    HyperLogLog().update(x*x for x in S if x%2==1 and x>3).estimate()
+    return
+
+
+@app.cell
+def _(S, set_builder):
+    # the same set, written like the maths: {x^2 : x ∈ S; x mod 2 = 1; x > 3}. set_builder (see setbuilder.py) checks each
+    # condition on a whole numpy chunk at once, and only on the elements that passed the earlier conditions
+    set_builder(S, [lambda x: x%2==1, lambda x: x>3], lambda x: x*x)
+    return
+
+
 @app.cell(hide_code=True)
 def _(mo):
     mo.md(
@@ -181,6 +257,15 @@ def _(mo):
     return
 
 
+@app.cell
+def _(infinite_sum, itertools):
+    # a computer can't add up infinitely many terms, but it can stop once the sum stops changing.
+    # Aitken acceleration gets the limit 1 of 1/2 + 1/4 + 1/8 + ... after a handful of terms (see series.py)
+    (infinite_sum(1 / 2**i for i in itertools.count(1)),
+     infinite_sum((1 / i**2 for i in itertools.count(1)), accelerate="richardson"))
+    return
+
+
 @app.cell(hide_code=True)
 def _(mo):
     mo.md(
@@ -206,6 +291,19 @@ def _():
     return
 
 
+@app.cell
+def _(PowerFamily, mo, np):
+    # pow_iter makes one closure per exponent, and each call handles one number.
+    # PowerFamily evaluates x**n for every x and every n in one broadcast (see families.py).
+    # Careful: the closures late-bind n, so [f(2) for f in list(pow_iter({1,2,5}))] is [32, 32, 32]
+    _powers = PowerFamily({1, 2, 5})
+    # the last one takes about half a second, so it only runs once this output scrolls into view (see startup.py)
+    mo.lazy(lambda: (max(_powers(2)),
+                     _powers(np.arange(4)),  # one row per x, one column per n
+                     PowerFamily(range(1000)).reduce(np.linspace(0, 1, 10**5), "max", axis=1)[-3:]))
+    return
+
+
 @app.cell(hide_code=True)
 def _(mo):
     mo.accordion({"### Questions" : r"""
@@ -303,6 +401,15 @@ def _(alphabet_dict):
     return
 
 
+@app.cell
+def _(TranslationTable, alphabet):
+    # the same mapping as a 256-entry lookup table: a whole text is translated in one C call,
+    # instead of one dict lookup per character (see translation.py)
+    cipher = TranslationTable.from_zip(alphabet, sorted(alphabet, reverse=True))
+    (cipher["b"], cipher.translate("hello world"), cipher.inverse().translate("svool dliow"))
+    return
+
+
 @app.cell(hide_code=True)
 def _(mo):
     mo.md(
@@ -371,6 +478,17 @@ def _(some_odd_numbers):
     return
 
 
+@app.cell
+def _(ArithmeticSequence, some_odd_numbers):
+    # sum(some_odd_numbers) still adds the numbers one by one. But the sum of evenly spaced numbers has a formula
+    # (n*first + step*n(n-1)/2), and ArithmeticSequence (see sequences.py) uses it: summing a trillion numbers is instant.
+    # It also does float steps like np.linspace(1,5,num=5), without allocating them
+    (ArithmeticSequence(1, 39, 2).sum() == sum(some_odd_numbers),
+     ArithmeticSequence(1, 10**12).sum(),
+     list(ArithmeticSequence.linspace(1, 5, num=5)))
+    return
+
+
 @app.cell(hide_code=True)
 def _(mo):
     mo.md(
@@ -424,6 +542,17 @@ def _(np, simple_array):
     return
 
 
+@app.cell
+def _(GrowableArray, np):
+    # if you really do need to add elements one at a time, keep some spare room at the end (see growable.py).
+    # Doubling the room whenever it runs out means each element gets copied only about once on average
+    growing_array = GrowableArray(np.int64)
+    for _reading in (1, 5, 6, 45):
+        growing_array.append(_reading)
+    growing_array.freeze()
+    return
+
+
 @app.cell(hide_code=True)
 def _(mo):
     mo.callout(mo.md(r""" ### **Key Concept**: Pass by reference vs pass by value
@@ -458,6 +587,19 @@ def _(an_array, change_array):
     return
 
 
+@app.cell
+def _(CopyOnWrite, np, track_copies):
+    # the fix without copying every argument up front: the function gets a copy-on-write
+    # wrapper, and only pays for a copy when it actually changes something (see frozen.py)
+    _numbers = np.array([1, 3, 4])
+    with track_copies() as ledger:
+        _changed = CopyOnWrite(_numbers)
+        _changed.append(42)
+    print("the function's copy is", _changed.data, "and the caller still has", _numbers)
+    ledger
+    return
+
+
 @app.cell
 def _():
     #code block 2
@@ -488,7 +630,7 @@ def _(mo):
 def _():
     places = ("Shoreham-by-sea", "Worthing", "Brighton", "Eastbourne")
     temps = (16.4, 17.2, 18.3, 17.9)
-    return
+    return places, temps
 
 
 @app.cell(hide_code=True)
@@ -500,6 +642,16 @@ def _(mo):
     return
 
 
+@app.cell
+def _(Records, places, temps):
+    # the same pairs as one table of aligned columns: no tuple per row, and all the lines
+    # are formatted in one go (see Records in columns.py)
+    sea = Records(place=places, temp=temps)
+    print(sea.to_text("in {place}, the sea temperature is {temp}"))
+    sea
+    return
+
+
 @app.cell(hide_code=True)
 def _(mo):
     mo.md(
@@ -525,7 +677,7 @@ def _(mo):
 @app.cell(hide_code=True)
 def _(mo):
     mo.callout(mo.md(r""" ### Important
-    	From now on, we will refer to an ordered collection with $n$ indexing variables as an $n$-tensor, or an $n$-dimensional tensor
+    From now on, we will refer to an ordered collection with $n$ indexing variables as an $n$-tensor, or an $n$-dimensional tensor
 
     So the table above is a two-tensor: to reference its elements we need two indexing variables (row and column number). 
 
@@ -547,17 +699,17 @@ def _(mo):
 @app.cell(hide_code=True)
 def _(mo):
     mo.callout(mo.md(r"""### Notation
-    	    	Commonly used terms for different tensors:
+    Commonly used terms for different tensors:
 
-    	**1-tensor** $\leftrightarrow$ **Vector**
+    **1-tensor** $\leftrightarrow$ **Vector**
 
-    	**2-tensor** $\leftrightarrow$ **Matrix**
+    **2-tensor** $\leftrightarrow$ **Matrix**
 
 
-    	The 1st/2nd indices of a matrix are called its rows and columns. The 3rd index of a 3-tensor is often referred to as a **layer** (as you see in a neural network) 
+    The 1st/2nd indices of a matrix are called its rows and columns. The 3rd index of a 3-tensor is often referred to as a **layer** (as you see in a neural network) 
 
-    	Learn these!!!
-    	"""),kind="info" )
+    Learn these!!!
+    """),kind="info" )
     return
 
 
@@ -568,19 +720,23 @@ def _(mo):
 
 
 @app.cell
-def _(np):
+def _(random_tensor):
     shape = (3, 4, 5)
-    # Create a 3D array of random numbers using list comprehension
-    random_3d_array = np.array([[[np.random.random() for _ in range(shape[2])] 
-                               for _ in range(shape[1])] 
-                               for _ in range(shape[0])])
+    # Create a 3D array of random numbers. You could use a triple list comprehension:
+    #   np.array([[[np.random.random() for _ in range(shape[2])] for _ in range(shape[1])] for _ in range(shape[0])])
+    # but that calls a Python function per element and then copies the nested lists. random_tensor (see tensors.py)
+    # asks numpy's random generator for the whole array at once
+    random_3d_array = random_tensor(shape)
     return (random_3d_array,)
 
 
 @app.cell
-def _(mo, np, random_3d_array):
+def _(blocked_reduce, mo, np, random_3d_array):
     mo.output.append(random_3d_array[2,1,1]) # access an individual element
     mo.output.append(np.mean(random_3d_array, axis = (0,1))) #mean of each layer (i.e. averaged across rows and columns)
+    # the same means, computed one slab of rows at a time (see blocked.py). This also works for a tensor saved on disk
+    # with np.save that is far too big to load: blocked_reduce("cube.npy", "mean", axis=(0,1))
+    mo.output.append(blocked_reduce(random_3d_array, "mean", axis = (0,1), block_bytes=100))
     return
 
 
@@ -594,9 +750,9 @@ def _(mo):
 
     - Data usually amounts to an ordered collection of **things**. For instance, an excel spreadsheet is a 2-tensor, ordered by rows and columns. So data is an iterable!
     - Data cleaning/processing/analysis usually amounts to a sequence of operations on the data. One could write a script that iteratively transforms the data by doing the desired operations. EG
-          1. Clean the data by removing outliers and unnecessary datapoints
-          2. Convert the data (e.g. from centimetres to metres)
-          3. Analyse the data by finding its statistics (mean, variance, whatever)
+        1. Clean the data by removing outliers and unnecessary datapoints
+        2. Convert the data (e.g. from centimetres to metres)
+        3. Analyse the data by finding its statistics (mean, variance, whatever)
 
     - The straightforward way to do this is to write a long block of code that does these operations in turn. But this has a few issues
         1. You're creating new intermediate collections (e.g. of the converted data), which is slow and wastes space. And what if you accidentally corrupt one of the intermediate collections? (e.g. with the pass by reference issues above)
@@ -642,7 +798,7 @@ def _(celsius_converter, itertools, temperatures_fahrenheit):
 
 
 @app.cell
-def _(hot_days, mo, np, temp_differences):
+def _(describe, hot_days, mo, np, temp_differences):
     #list hot days if needed, by collecting the iterator elements (but usually wouldn't want to do this)
     mo.output.append(np.fromiter(hot_days(), int))
     #count hot days
@@ -650,7 +806,86 @@ def _(hot_days, mo, np, temp_differences):
     #list temperature differences between days
     mo.output.append(np.fromiter(temp_differences(), int))
     # some functions, like np.std, need a concrete array rather than an iterator. Ideally, the numpy creators would amend this!
-    mo.output.append(np.std(np.fromiter(temp_differences(),int)))
+    # describe (see streaming_stats.py) gets the std, mean, min, max... of the iterator in one pass, without allocating an array
+    mo.output.append(describe(temp_differences(), quantiles=(0.5,)))
+    return
+
+
+@app.cell
+def _(ChunkedStream, celsius_converter, temperatures_fahrenheit):
+    # the same three pipelines, but run on numpy chunks rather than one element at a time (see chunked.py).
+    # celsius_converter works on whole arrays too, so each chunk is converted by a single vectorised numpy operation
+    celsius_chunks = ChunkedStream(temperatures_fahrenheit, chunk_size=8).map(celsius_converter)
+    hot_day_chunks = celsius_chunks.filter(lambda x: x > 25)
+    temp_difference_chunks = celsius_chunks.diff() # carries the last element of each chunk over to the next
+    (hot_day_chunks.to_array(), hot_day_chunks.count(), temp_difference_chunks.stats())
+    return
+
+
+@app.cell
+def _(celsius_converter, rolling, temperatures_fahrenheit, window_diff):
+    # temp_differences() runs celsius_iterator() twice. These read a single iterator once, keeping
+    # only the last few values, and also do rolling statistics (see windows.py).
+    # The chunked versions are ChunkedStream(...).rolling(7, "mean") and .ewm(alpha)
+    _celsius = lambda: map(celsius_converter, temperatures_fahrenheit)
+    (list(window_diff(_celsius())), list(rolling(_celsius(), 7, "mean")), list(rolling(_celsius(), 7, "max")))
+    return
+
+
+@app.cell
+async def _(AsyncChunkedStream, celsius_converter, fan_in, replay, temperatures_fahrenheit):
+    # live readings: three pretend stations replay the temperatures at the same time, merged into one
+    # stream through a bounded queue, then the same hot-day pipeline runs on each chunk as it arrives
+    # (see async_streams.py; tail_file follows a real file instead)
+    _stations = [replay(temperatures_fahrenheit, chunk_size=8) for _ in range(3)]
+    await AsyncChunkedStream(fan_in(*_stations)).map(celsius_converter).filter(lambda x: x > 25).count()
+    return
+
+
+@app.cell
+def _(IncrementalView, celsius_converter, temperatures_fahrenheit):
+    # when new readings keep arriving, keep the answers up to date instead of recomputing them:
+    # each append only processes the new readings (see incremental.py)
+    hot_day_count = IncrementalView("count").map(celsius_converter).filter(lambda x: x > 25)
+    difference_stats = IncrementalView("stats").map(celsius_converter).diff()
+    for _view in (hot_day_count, difference_stats):
+        _view.append(temperatures_fahrenheit)
+        _view.append([81, 79, 101])  # tomorrow's readings
+    (hot_day_count.value, difference_stats.value.count, difference_stats.value.std())
+    return
+
+
+@app.cell
+def _(ChunkedStream, cached, celsius_converter, temperatures_fahrenheit):
+    # marimo re-runs this cell whenever a cell it depends on re-runs, even if the temperatures are unchanged.
+    # @cached keys the result on the *contents* of the input, so a re-run just looks it up (see cache.py)
+    @cached
+    def difference_array(temperatures):
+        return ChunkedStream(temperatures).map(celsius_converter).diff().to_array()
+
+    difference_array(temperatures_fahrenheit)
+    (difference_array(temperatures_fahrenheit.copy()), difference_array.cache.stats())
+    return
+
+
+@app.cell
+def _(Pipeline, celsius_converter, temperatures_fahrenheit):
+    # Pipeline (see pipeline.py) only records the stages, then fuses them into one loop.
+    # celsius is a single node used by both sides of the zip, so it is only converted once per day
+    _celsius = Pipeline.source().map(celsius_converter)
+    fused_temp_differences = _celsius.zip(_celsius.lag(1)).map(lambda today, tomorrow: tomorrow - today).compile()
+    list(fused_temp_differences(temperatures_fahrenheit))
+    return
+
+
+@app.cell
+def _(ChunkedStream, ColumnFile, celsius_converter, temperatures_fahrenheit):
+    # a dataset too big for memory would live in a file. ColumnFile (see sources.py) memory-maps it: only the parts
+    # being used are read from disk. It can be iterated like an array, so the same pipelines run on it unchanged
+    import tempfile as _tempfile
+    temperatures_on_disk = ColumnFile.write(_tempfile.mkdtemp() + "/temperatures_fahrenheit.bin", temperatures_fahrenheit)
+    (list(filter(lambda x: x > 25, map(celsius_converter, temperatures_on_disk))),
+     ChunkedStream(temperatures_on_disk).map(celsius_converter).diff().stats())
     return
 
 
@@ -682,23 +917,27 @@ def _(mo):
 
 
 @app.cell
-def _(pd):
-    cars = pd.read_json(
-        "https://raw.githubusercontent.com/vega/vega-datasets/master/data/cars.json"
-    )
+def _(deferred, load_cars):
+    # downloads https://raw.githubusercontent.com/vega/vega-datasets/master/data/cars.json the first time,
+    # and loads it from a local cache after that (see datasets.py). Offline? use load_cars(fixture="path/to/cars.json")
+    # deferred (see startup.py): nothing is loaded, and pandas isn't imported, until a cell first uses cars
+    cars = deferred(load_cars)
     return (cars,)
 
 
 @app.cell
-def _(cars):
-    cars
+def _(cars, mo):
+    mo.lazy(cars.get)  # shown once it scrolls into view
     return
 
 
 @app.cell
-def _(cars, np):
-    mpg = np.array(cars["Miles_per_Gallon"]) 
-    hp = np.array(cars["Horsepower"])
+def _(cars, deferred):
+    # to_numpy gives a view of the dataframe's column, np.array would copy it.
+    # Wrapped in deferred (see startup.py), so the cars are only loaded when mpg or hp is first used. They work like
+    # the numpy vectors they stand for (indexing, iterating, arithmetic, np functions); mpg.get() is the ndarray itself
+    mpg = deferred(lambda: cars["Miles_per_Gallon"].to_numpy())
+    hp = deferred(lambda: cars["Horsepower"].to_numpy())
     return
 
 
@@ -716,6 +955,15 @@ def _(mo):
     return
 
 
+@app.cell
+def _(Query, cars, mo):
+    # the same question as a column query (see columns.py): the condition becomes one boolean mask over the whole column,
+    # and the max is a masked numpy reduction that skips NaNs. No tuple is built per car.
+    # mo.lazy: run (and load the cars) once this output scrolls into view
+    mo.lazy(lambda: Query(cars, mpg="Miles_per_Gallon", hp="Horsepower").where("hp**2 > 10300").max("mpg"))
+    return
+
+
 @app.cell
 def _():
     return
@@ -0,0 +1,197 @@
+"""Measure the lazy-vs-eager claims the notebook makes.
+
+Each claim pairs the idiom the notebook recommends ("lazy") with the one it
+warns against ("eager"), both as functions of a problem size n. For every size
+from 10^3 up to 10^max_exp, each version is timed (best of a few runs). It is
+then run once more under tracemalloc, to record its peak memory. Allocation
+counts aren't recorded: tracemalloc only sees the blocks alive at a given
+moment, not how many were allocated and freed along the way, and there is no
+cheap way to count that from Python. The eager idioms show up as peaks that
+grow with n instead.
+
+Results are appended to a JSON history file. A run whose time is more than
+`--threshold` times the best time in the history counts as a regression:
+
+    python benchmarks.py                      # all claims, sizes 10^3..10^6
+    python benchmarks.py --max-exp 8 --claims generator_sum,range_memory
+"""
+
+import argparse
+import json
+import math
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from streaming_stats import describe
+
+DEFAULT_HISTORY = Path(__file__).resolve().parent / "bench_history.json"
+
+
+# --- the claims: each is (lazy version, eager version, largest sensible n, description) ---
+
+def _generator_sum(n):
+    S = set(range(n))
+    return sum(x * x for x in S)
+
+
+def _set_comprehension_sum(n):
+    S = set(range(n))
+    sc = {x * x for x in S}
+    return sum(sc)
+
+
+def _map_filter_chain(n):
+    dataset = range(n)
+    roots = map(math.sqrt, dataset)
+    big = filter(lambda el: el > 10, roots)
+    return sum(map(lambda el: 2 * el, big))
+
+
+def _intermediate_lists(n):
+    intermediate_dataset = [math.sqrt(el) for el in range(n)]
+    intermediate2 = [el for el in intermediate_dataset if el > 10]
+    intermediate3 = intermediate2[::-1]
+    final_dataset = [2 * el for el in intermediate3]
+    return sum(final_dataset)
+
+
+def _list_append_then_array(n):
+    values = []
+    for i in range(n):
+        values.append(i)
+    return np.array(values)
+
+
+def _np_append_loop(n):
+    values = np.empty(0, dtype=np.int64)
+    for i in range(n):
+        values = np.append(values, i)
+    return values
+
+
+def _range_sum(n):
+    return sum(range(n))
+
+
+def _list_sum(n):
+    return sum(list(range(n)))
+
+
+def _streaming_std(n):
+    return describe(x * 0.5 for x in range(n))["std"]
+
+
+def _fromiter_std(n):
+    return np.std(np.fromiter((x * 0.5 for x in range(n)), float))
+
+
+def _generator_count(n):
+    return sum(1 for el in set(range(n)))
+
+
+def _len_count(n):
+    return len(set(range(n)))
+
+
+CLAIMS = {
+    "generator_sum": (_generator_sum, _set_comprehension_sum, 10**8,
+                      "sum(iter) over a generator vs summing a set comprehension"),
+    "map_filter": (_map_filter_chain, _intermediate_lists, 10**8,
+                   "chained map/filter vs intermediate datasets"),
+    "np_append": (_list_append_then_array, _np_append_loop, 10**5,
+                  "np.append in a loop is 'very computationally inefficient'"),
+    "range_memory": (_range_sum, _list_sum, 10**8,
+                     "a range takes constant memory"),
+    "streaming_std": (_streaming_std, _fromiter_std, 10**8,
+                      "one-pass std of an iterator vs np.std(np.fromiter(...))"),
+    "cardinality": (_len_count, _generator_count, 10**8,
+                    "len() vs sum(1 for el in some_set)"),
+}
+
+
+# --- measuring ---
+
+def measure(func, n, repeat=3):
+    """Best wall time over `repeat` runs, plus the peak memory of one traced run."""
+    best = math.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(n)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        result = func(n)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return {"seconds": best, "peak_bytes": peak}
+
+
+def run(claims, max_exp=6, repeat=3, out=print):
+    records = []
+    for name in claims:
+        lazy, eager, max_size, description = CLAIMS[name]
+        out(f"{name}: {description}")
+        for exp in range(3, max_exp + 1):
+            n = 10**exp
+            if n > max_size:
+                break
+            for variant, func in (("lazy", lazy), ("eager", eager)):
+                record = {"claim": name, "variant": variant, "n": n, **measure(func, n, repeat)}
+                records.append(record)
+                out(f"  n=10^{exp} {variant:>5}: {record['seconds']:10.6f}s  "
+                    f"peak {record['peak_bytes'] / 1e6:10.3f} MB")
+    return records
+
+
+def find_regressions(records, history, threshold):
+    """Records more than `threshold` times slower than the best earlier time for the same (claim, variant, n)."""
+    best = {}
+    for run_ in history:
+        for r in run_["records"]:
+            key = (r["claim"], r["variant"], r["n"])
+            best[key] = min(best.get(key, math.inf), r["seconds"])
+    return [(r, best[key]) for r in records
+            if (key := (r["claim"], r["variant"], r["n"])) in best and r["seconds"] > threshold * best[key]]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--claims", default=",".join(CLAIMS), help="comma separated, from: " + ", ".join(CLAIMS))
+    parser.add_argument("--max-exp", type=int, default=6, help="largest size is 10^max_exp (up to 8)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--history", type=Path, default=DEFAULT_HISTORY)
+    parser.add_argument("--threshold", type=float, default=1.25)
+    args = parser.parse_args(argv)
+
+    claims = [c for c in args.claims.split(",") if c]
+    unknown = set(claims) - set(CLAIMS)
+    if unknown:
+        parser.error(f"unknown claims: {', '.join(sorted(unknown))}")
+    records = run(claims, args.max_exp, args.repeat)
+
+    history = json.loads(args.history.read_text()) if args.history.exists() else []
+    regressions = find_regressions(records, history, args.threshold)
+    for record, best in regressions:
+        print(f"REGRESSION {record['claim']} {record['variant']} n={record['n']}: "
+              f"{record['seconds']:.6f}s vs best {best:.6f}s")
+    history.append({
+        "when": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "records": records,
+    })
+    args.history.write_text(json.dumps(history, indent=1))
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+"""Reduce a tensor that lives on disk, one block at a time.
+
+`np.mean(random_3d_array, axis=(0, 1))` needs the whole tensor in memory.
+`blocked_reduce` instead walks a memory-mapped tensor (an `np.memmap`, or a
+`.npy` path opened with `mmap_mode="r"`) in slabs along its first axis, so
+only one slab is read at a time:
+
+    blocked_reduce("cube.npy", "mean", axis=(0, 1))   # the mean of each layer
+
+- If the first axis is kept, every slab reduces to its own part of the answer.
+- If the first axis is reduced, every slab reduces to partial results, which
+  are combined as they arrive. Sums are added with Kahan compensation, so
+  rounding errors don't build up over thousands of slabs. Variances are merged
+  with Chan's formula, never from a sum of squares.
+
+Within a slab, numpy's own sums are already pairwise. `workers=n` reduces the
+slabs in n processes, each of which opens the file itself.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+REDUCTIONS = ("sum", "mean", "var", "std", "min", "max")
+
+
+def _open(array):
+    if isinstance(array, np.ndarray):
+        return array
+    return np.load(array, mmap_mode="r")
+
+
+def _normalise_axes(axis, ndim):
+    if axis is None:
+        return tuple(range(ndim))
+    axes = (axis,) if np.ndim(axis) == 0 else tuple(axis)
+    return tuple(sorted(a % ndim for a in axes))
+
+
+def _slab_rows(array, block_bytes):
+    row_bytes = max(1, array[:1].nbytes)
+    return max(1, block_bytes // row_bytes)
+
+
+def _partial(slab, how, axes):
+    """The partial result of one slab, as a dict of arrays."""
+    slab = np.asarray(slab)
+    if how in ("min", "max"):
+        return {how: getattr(slab, how)(axis=axes)}
+    count = int(np.prod([slab.shape[a] for a in axes]))
+    total = slab.sum(axis=axes, dtype=np.float64)
+    part = {"count": count, "sum": total}
+    if how in ("var", "std"):
+        mean = total / count
+        deviations = slab - np.expand_dims(mean, axes)
+        part["m2"] = (deviations**2).sum(axis=axes)
+    return part
+
+
+def _finish(part, how):
+    if how in ("min", "max"):
+        return part[how]
+    if how == "sum":
+        return part["sum"]
+    if how == "mean":
+        return part["sum"] / part["count"]
+    var = part["m2"] / part["count"]
+    return var if how == "var" else np.sqrt(var)
+
+
+class _Combiner:
+    """Folds slab partials together, for when the first axis is reduced."""
+
+    def __init__(self, how):
+        self.how = how
+        self.state = None
+        self.compensation = 0.0
+
+    def add(self, part):
+        if self.state is None:
+            self.state = part
+            return
+        state, how = self.state, self.how
+        if how == "min":
+            state["min"] = np.minimum(state["min"], part["min"])
+            return
+        if how == "max":
+            state["max"] = np.maximum(state["max"], part["max"])
+            return
+        n_a, n_b = state["count"], part["count"]
+        if "m2" in state:
+            delta = part["sum"] / n_b - state["sum"] / n_a
+            state["m2"] = state["m2"] + part["m2"] + delta**2 * n_a * n_b / (n_a + n_b)
+        # Kahan summation of the running total
+        y = part["sum"] - self.compensation
+        t = state["sum"] + y
+        self.compensation = (t - state["sum"]) - y
+        state["sum"] = t
+        state["count"] = n_a + n_b
+
+
+def _memmap_task(filename, offset, dtype, shape, start, stop, how, axes, keep_first):
+    array = np.memmap(filename, dtype=dtype, mode="r", offset=offset, shape=shape)
+    part = _partial(array[start:stop], how, axes)
+    return _finish(part, how) if keep_first else part
+
+
+def blocked_reduce(array, how, axis=None, block_bytes=64 << 20, workers=None, out=None):
+    """Reduce `array` (an array, memmap, or path to a .npy file) over `axis`, slab by slab.
+
+    `how` is one of "sum", "mean", "var", "std", "min", "max". Variance uses
+    ddof=0, like np.var. `out` can be a preallocated array (even another memmap)
+    for results too big to keep in memory.
+    """
+    if how not in REDUCTIONS:
+        raise ValueError(f"how must be one of {', '.join(REDUCTIONS)}")
+    array = _open(array)
+    if array.ndim == 0:
+        raise ValueError("nothing to reduce in a 0-tensor")
+    axes = _normalise_axes(axis, array.ndim)
+    keep_first = 0 not in axes
+    rows = _slab_rows(array, block_bytes)
+    bounds = [(start, min(start + rows, len(array))) for start in range(0, len(array), rows)]
+
+    if workers:
+        if not isinstance(array, np.memmap):
+            raise ValueError("workers need a memory-mapped array, so each process can open the file itself")
+        pool = ProcessPoolExecutor(workers)
+        spec = (array.filename, array.offset, array.dtype, array.shape)
+        results = pool.map(_memmap_task, *zip(*[spec + (start, stop, how, axes, keep_first)
+                                                for start, stop in bounds]))
+    else:
+        pool = None
+        results = (_finish(_partial(array[start:stop], how, axes), how) if keep_first
+                   else _partial(array[start:stop], how, axes) for start, stop in bounds)
+
+    try:
+        if keep_first:
+            if out is None:
+                out_shape = tuple(n for i, n in enumerate(array.shape) if i not in axes)
+                out_dtype = array.dtype if how in ("min", "max") else np.float64
+                out = np.empty(out_shape, dtype=out_dtype)
+            for (start, stop), result in zip(bounds, results):
+                out[start:stop] = result
+            return out
+        combiner = _Combiner(how)
+        for part in results:
+            combiner.add(part)
+        result = _finish(combiner.state, how)
+        if out is not None:
+            out[...] = result
+            return out
+        return result
+    finally:
+        if pool is not None:
+            pool.shutdown()
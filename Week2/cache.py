@@ -0,0 +1,267 @@
+"""Remember the results of pure functions, keyed on the content of their inputs.
+
+marimo re-runs a cell whenever something it depends on is re-run, even if the
+data it receives is byte-for-byte the same as last time. `@cached` skips the
+work in that case:
+
+    @cached
+    def difference_stats(temperatures):
+        return ChunkedStream(temperatures).map(celsius_converter).diff().stats()
+
+The key is a hash of the arguments' *contents*: array buffers are hashed
+directly (xxhash's xxh3 if it is installed, else sha256), with their dtype and
+shape, without pickling or copying them. Buffers over `BLOCK_BYTES` are hashed
+block by block on a thread pool. DataFrames are hashed column by
+column with pandas' vectorised hashing. Functions are hashed by their code and
+the values they close over (not the globals they read), so editing a function
+invalidates its entries.
+
+Results live in memory, least recently used first out, within `max_bytes`.
+A cache with a `disk_dir` also keeps array results there as `.npy` files, so
+they survive a restart of the notebook. `cache.stats()` reports hits and
+misses. Cached arrays are handed out read-only (see frozen.py), since every
+caller shares them.
+
+Only cache functions whose result depends on nothing but their arguments:
+not `random_tensor(shape)` without a seed, for instance.
+"""
+
+import functools
+import hashlib
+import pickle
+import sys
+import types
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from frozen import freeze
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+DEFAULT_MAX_BYTES = 1 << 28
+
+CacheStats = namedtuple("CacheStats", "hits misses disk_hits evictions entries nbytes")
+
+
+# --- content hashing ---
+
+BLOCK_BYTES = 1 << 23
+_pool = None
+
+
+def _new_hasher():
+    # sha256 rather than blake2b: CPUs with SHA extensions run it 2-3x faster
+    return xxhash.xxh3_128() if xxhash is not None else hashlib.sha256()
+
+
+def _block_digest(block):
+    hasher = _new_hasher()
+    hasher.update(block)
+    return hasher.digest()
+
+
+def _feed_buffer(hasher, data):
+    """Hash a big buffer as the digests of its blocks, computed in threads (hashing releases the GIL)."""
+    global _pool
+    if len(data) <= BLOCK_BYTES:
+        hasher.update(data)
+        return
+    if _pool is None:
+        _pool = ThreadPoolExecutor(thread_name_prefix="content-hash")
+    blocks = (data[start:start + BLOCK_BYTES] for start in range(0, len(data), BLOCK_BYTES))
+    hasher.update(b"T" + b"".join(_pool.map(_block_digest, blocks)))
+
+
+def _feed(hasher, value):
+    update = hasher.update
+    if isinstance(value, np.ndarray):
+        update(b"A" + value.dtype.str.encode() + repr(value.shape).encode())
+        if value.dtype.hasobject:
+            for item in value.ravel().tolist():
+                _feed(hasher, item)
+        else:
+            _feed_buffer(hasher, memoryview(np.ascontiguousarray(value).reshape(-1)).cast("B"))
+    elif type(value).__module__.startswith("pandas"):
+        import pandas as pd
+
+        update(b"P" + repr(getattr(value, "shape", None)).encode())
+        _feed(hasher, [str(c) for c in getattr(value, "columns", [])])
+        _feed(hasher, pd.util.hash_pandas_object(value, index=True).to_numpy())
+    elif isinstance(value, (bytes, bytearray, memoryview)):
+        data = bytes(value)
+        update(b"B" + len(data).to_bytes(8, "little") + data)
+    elif isinstance(value, str):
+        _feed(hasher, value.encode())
+        update(b"S")
+    elif value is None or isinstance(value, (bool, int, float, complex, np.generic)):
+        update(b"N" + repr(value).encode() + type(value).__name__.encode())
+    elif isinstance(value, (tuple, list)):
+        update(b"L" + type(value).__name__.encode() + len(value).to_bytes(8, "little"))
+        for item in value:
+            _feed(hasher, item)
+    elif isinstance(value, dict):
+        update(b"D" + len(value).to_bytes(8, "little"))
+        for key in sorted(value, key=repr):
+            _feed(hasher, key)
+            _feed(hasher, value[key])
+    elif callable(value) and hasattr(value, "__code__"):
+        _feed_function(hasher, value)
+    elif isinstance(value, types.ModuleType):
+        update(b"M" + value.__name__.encode())
+    else:
+        try:
+            data = pickle.dumps(value)  # anything else: as a last resort, its pickle
+        except Exception as error:
+            raise TypeError(f"can't hash a {type(value).__name__} for a cache key") from error
+        update(b"O" + data)
+
+
+def _feed_code(hasher, code):
+    # co_code alone is the same for np.sum(x) and np.max(x): the names it uses are in co_names
+    hasher.update(b"C" + code.co_code)
+    _feed(hasher, code.co_names + code.co_varnames)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):  # nested functions, lambdas and comprehensions
+            _feed_code(hasher, const)
+        else:
+            _feed(hasher, const)
+
+
+def _feed_function(hasher, func, _seen=None):
+    seen = _seen if _seen is not None else set()
+    if id(func) in seen:  # recursive functions close over themselves
+        return
+    seen.add(id(func))
+    hasher.update(b"F" + f"{func.__module__}.{func.__qualname__}".encode())
+    _feed_code(hasher, func.__code__)
+    _feed(hasher, func.__defaults__ or ())
+    for cell in func.__closure__ or ():
+        try:
+            contents = cell.cell_contents
+        except ValueError:  # an empty cell
+            continue
+        if callable(contents) and hasattr(contents, "__code__"):
+            _feed_function(hasher, contents, seen)
+        else:
+            _feed(hasher, contents)
+
+
+def content_hash(*args, **kwargs):
+    """A hex digest of the contents of the arguments (arrays by their buffers)."""
+    hasher = _new_hasher()
+    _feed(hasher, args)
+    _feed(hasher, kwargs)
+    return hasher.hexdigest()
+
+
+# --- the cache ---
+
+def _size(value):
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if hasattr(value, "memory_usage"):
+        usage = value.memory_usage(index=True)
+        return int(usage.sum() if hasattr(usage, "sum") else usage)
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(_size(item) for item in value)
+    return sys.getsizeof(value)
+
+
+def _share(value):
+    return freeze(value) if isinstance(value, np.ndarray) else value
+
+
+class ResultCache:
+    """An LRU cache of results by content hash, within `max_bytes` (and `max_entries`, if given)."""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, max_entries=None, disk_dir=None):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.disk_dir = Path(disk_dir) if disk_dir is not None else None
+        self._entries = OrderedDict()  # key -> (value, size)
+        self.nbytes = 0
+        self.hits = self.misses = self.disk_hits = self.evictions = 0
+
+    def _disk_path(self, key):
+        return self.disk_dir / f"{key}.npy"
+
+    def get(self, key, default=None):
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key][0]
+        if self.disk_dir is not None and self._disk_path(key).exists():
+            value = np.load(self._disk_path(key), mmap_mode="r")
+            self._remember(key, value)
+            self.disk_hits += 1
+            return value
+        self.misses += 1
+        return default
+
+    def __contains__(self, key):
+        return key in self._entries or (self.disk_dir is not None and self._disk_path(key).exists())
+
+    def put(self, key, value):
+        value = _share(value)
+        if (self.disk_dir is not None and isinstance(value, np.ndarray)
+                and not value.dtype.hasobject and not self._disk_path(key).exists()):
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+            np.save(self._disk_path(key), value)
+        self._remember(key, value)
+        return value
+
+    def _remember(self, key, value):
+        if key in self._entries:
+            self.nbytes -= self._entries.pop(key)[1]
+        size = _size(value)
+        self._entries[key] = (value, size)
+        self.nbytes += size
+        while self._entries and (self.nbytes > self.max_bytes or
+                                 (self.max_entries is not None and len(self._entries) > self.max_entries)):
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.nbytes -= evicted
+            self.evictions += 1
+
+    def clear(self, disk=False):
+        self._entries.clear()
+        self.nbytes = 0
+        if disk and self.disk_dir is not None:
+            for path in self.disk_dir.glob("*.npy"):
+                path.unlink()
+
+    def stats(self):
+        return CacheStats(self.hits, self.misses, self.disk_hits, self.evictions, len(self._entries), self.nbytes)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return f"ResultCache({len(self)} entries, {self.nbytes} bytes, {self.hits} hits, {self.misses} misses)"
+
+
+DEFAULT_CACHE = ResultCache()
+
+
+def cached(func=None, *, cache=None):
+    """Decorator: reuse func's result when it is called again with arguments of the same content."""
+    if func is None:
+        return functools.partial(cached, cache=cache)
+    store = cache if cache is not None else DEFAULT_CACHE
+    missing = object()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        key = content_hash(func, args, kwargs)
+        result = store.get(key, missing)
+        if result is missing:
+            result = store.put(key, func(*args, **kwargs))
+        return result
+
+    wrapper.cache = store
+    return wrapper
@@ -0,0 +1,69 @@
+"""Count things without counting them one by one, when you can.
+
+`sum(1 for el in some_set)` walks every element, even for a `set` or a
+`range` that already knows its size. `cardinality` only falls back to that when
+it has to:
+
+- anything with `__len__` (sets, ranges, arrays, `ColumnFile`s...) is O(1);
+- a `ChunkedStream` is counted chunk by chunk with vectorised mask sums;
+- anything else is counted by walking it.
+
+`size_hint` is the cheap version: a (size, exact) guess that never consumes
+anything. Pipelines pass it downstream (a map keeps the size, a filter makes it
+an upper bound, a lag of k removes k), so `fromiter` can allocate its output
+once instead of regrowing it.
+"""
+
+import math
+import numbers
+import operator
+
+import numpy as np
+
+from growable import GrowableArray
+
+
+def arithmetic_length(start, stop, step=1):
+    """How many terms start, start+step, ... are before `stop` (like len(np.arange(start, stop, step)))."""
+    if step == 0:
+        raise ValueError("step must not be zero")
+    if all(isinstance(v, numbers.Integral) for v in (start, stop, step)):
+        # exact integer ceil division: floats lose it above 2**53
+        return max(0, -((int(start) - int(stop)) // int(step)))
+    return max(0, math.ceil((stop - start) / step))
+
+
+def size_hint(obj):
+    """(size, exact) without consuming anything. size is None if there is no idea at all."""
+    if hasattr(obj, "size_hint"):
+        return obj.size_hint()
+    try:
+        return len(obj), True
+    except TypeError:
+        pass
+    estimate = operator.length_hint(obj, -1)
+    return (estimate, False) if estimate >= 0 else (None, False)
+
+
+def cardinality(obj):
+    """The number of elements in `obj`. Consumes `obj` only if it's a plain iterator."""
+    size, exact = size_hint(obj)
+    if exact:
+        return size
+    if hasattr(obj, "count") and hasattr(obj, "chunks"):
+        return obj.count()
+    return sum(1 for el in obj)
+
+
+def fromiter(iterable, dtype=np.float64):
+    """np.fromiter, but allocating once when the size is known (or guessable)."""
+    size, exact = size_hint(iterable)
+    if hasattr(iterable, "chunks"):
+        # room for the exact size or upper bound up front, so the buffer never has to regrow
+        grown = GrowableArray(dtype, capacity=size or 16)
+        for chunk in iterable.chunks():
+            grown.extend(chunk)
+        return grown.freeze()
+    if exact:
+        return np.fromiter(iterable, dtype=dtype, count=size)
+    return np.fromiter(iterable, dtype=dtype)
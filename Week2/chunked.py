@@ -0,0 +1,217 @@
+"""Lazy pipelines that run on numpy chunks instead of one element at a time.
+
+`map(celsius_converter, temperatures_fahrenheit)` is lazy, but every element
+gets boxed into a Python float and pushed through a Python function call.
+`ChunkedStream` keeps the same map / filter / lag style, but each stage sees a
+whole numpy chunk (a few tens of thousands of elements), so the work is done by
+numpy's vectorised loops. Only one chunk is ever alive at a time, so the full
+intermediate dataset is still never allocated.
+
+    celsius = ChunkedStream(temperatures_fahrenheit).map(celsius_converter)
+    hot_days = celsius.filter(lambda x: x > 25)
+    temp_differences = celsius.diff()
+    weekly_mean = celsius.rolling(7, "mean")
+
+Functions given to `map` / `filter` / `lag` must work on whole arrays, which
+plain arithmetic like `(x-32)*(5/9)` or `x > 25` already does.
+"""
+
+import itertools
+
+import numpy as np
+
+from streaming_stats import RunningStats
+from windows import ewm_step, rolling_step
+
+DEFAULT_CHUNK_SIZE = 1 << 16
+
+
+class StageBuilder:
+    """The map / filter / lag / diff / rolling / ewm methods, shared by every staged pipeline.
+
+    Each method records a (kind, arg) stage and returns `self._then(stage)`,
+    which a subclass defines. `make_step` turns a stage into the chunk -> chunk
+    function that runs it.
+    """
+
+    def _then(self, stage):
+        raise NotImplementedError
+
+    def map(self, func):
+        """Apply a vectorised `func` to every chunk."""
+        return self._then(("map", func))
+
+    def filter(self, predicate):
+        """Keep the elements where the vectorised `predicate` is True (a boolean mask)."""
+        return self._then(("filter", predicate))
+
+    def lag(self, k, combine):
+        """Combine each element with the one `k` places before it.
+
+        `combine(earlier, later)` gets two aligned arrays, so
+        `lag(1, lambda today, tomorrow: tomorrow - today)` is `temp_differences`.
+        The last `k` elements of each chunk are carried over to the next, so the
+        result doesn't depend on where the chunk boundaries fall.
+        """
+        if k < 1:
+            raise ValueError("k must be at least 1")
+        return self._then(("lag", (k, combine)))
+
+    def diff(self, k=1):
+        return self.lag(k, lambda earlier, later: later - earlier)
+
+    def rolling(self, window, agg="mean"):
+        """agg ("mean", "sum", "std", "max", ...) over every `window` consecutive elements (see windows.py)."""
+        if window < 1:
+            raise ValueError("window must be at least 1")
+        return self._then(("rolling", (window, agg)))
+
+    def ewm(self, alpha):
+        """The exponentially weighted mean, y = (1 - alpha) * previous y + alpha * x."""
+        if not 0 < alpha <= 1:
+            raise ValueError("alpha must be in (0, 1]")
+        return self._then(("ewm", alpha))
+
+
+class ChunkedStream(StageBuilder):
+    """A lazy, chunked pipeline over a numpy array (or any iterable).
+
+    Streams are immutable: `map`, `filter`, `lag`, `diff`, `rolling` and `ewm` return a new
+    stream with one more stage, so a stream can be reused as the start of
+    several pipelines (like calling `celsius_iterator()` again).
+    """
+
+    def __init__(self, source, chunk_size=DEFAULT_CHUNK_SIZE, stages=()):
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be positive")
+        self.source = source
+        self.chunk_size = chunk_size
+        self.stages = tuple(stages)
+
+    def _then(self, stage):
+        return ChunkedStream(self.source, self.chunk_size, self.stages + (stage,))
+
+    # --- running the pipeline ---
+
+    def _source_chunks(self):
+        size = self.chunk_size
+        source = self.source
+        if hasattr(source, "chunks"):
+            yield from source.chunks(size)
+        elif isinstance(source, np.ndarray):
+            for start in range(0, len(source), size):
+                yield source[start:start + size]
+        else:
+            it = iter(source)
+            while True:
+                chunk = np.array(list(itertools.islice(it, size)))
+                if len(chunk) == 0:
+                    return
+                yield chunk
+
+    def chunks(self):
+        """Yield the output of the pipeline, one numpy array at a time."""
+        steps = [make_step(kind, arg) for kind, arg in self.stages]
+        for chunk in self._source_chunks():
+            for step in steps:
+                chunk = step(chunk)
+                if len(chunk) == 0:
+                    break
+            else:
+                yield chunk
+
+    def __iter__(self):
+        # tolist() unboxes a whole chunk in C, much cheaper than one element at a time
+        for chunk in self.chunks():
+            yield from chunk.tolist()
+
+    # --- common reductions, done chunk by chunk ---
+
+    def to_array(self):
+        """Materialise the whole output (only do this if you really need it!)."""
+        parts = list(self.chunks())
+        return np.concatenate(parts) if parts else np.empty(0)
+
+    def size_hint(self):
+        """(size, exact) of the output, worked out from the source without running anything.
+
+        A map keeps the size, a filter turns it into an upper bound, a lag of k
+        makes it k shorter and a rolling window of w makes it w - 1 shorter.
+        """
+        size, exact = _source_size(self.source)
+        if size is None:
+            return None, False
+        for kind, arg in self.stages:
+            if kind == "filter":
+                exact = False
+            elif kind in ("lag", "rolling"):
+                size = max(0, size - arg[0] + (kind == "rolling"))
+        return size, exact
+
+    def __length_hint__(self):
+        size, _ = self.size_hint()
+        return 0 if size is None else size
+
+    def count(self):
+        if self.stages and self.stages[-1][0] == "filter":
+            # no need to pull the kept elements out, just add up the mask
+            upstream = ChunkedStream(self.source, self.chunk_size, self.stages[:-1])
+            predicate = self.stages[-1][1]
+            return int(sum(np.count_nonzero(predicate(chunk)) for chunk in upstream.chunks()))
+        size, exact = self.size_hint()
+        if exact:
+            return size
+        return sum(len(chunk) for chunk in self.chunks())
+
+    def sum(self):
+        return sum(chunk.sum() for chunk in self.chunks())
+
+    def stats(self):
+        """A `RunningStats` (count, mean, std, min, max) of the output, in one pass."""
+        stats = RunningStats()
+        for chunk in self.chunks():
+            stats.update_chunk(chunk)
+        return stats
+
+    def __repr__(self):
+        kinds = " -> ".join(kind for kind, _ in self.stages) or "source"
+        return f"ChunkedStream({kinds}, chunk_size={self.chunk_size})"
+
+
+def _source_size(source):
+    try:
+        return len(source), True
+    except TypeError:
+        return None, False
+
+
+def make_step(kind, arg):
+    """Turn a recorded stage into a function chunk -> chunk (with any state it needs as attributes)."""
+    if kind == "map":
+        return lambda chunk: np.asarray(arg(chunk))
+    if kind == "filter":
+        return lambda chunk: chunk[np.asarray(arg(chunk), dtype=bool)]
+    if kind == "lag":
+        return _Lagger(*arg)
+    if kind == "rolling":
+        return rolling_step(*arg)
+    if kind == "ewm":
+        return ewm_step(arg)
+    raise ValueError(f"unknown stage {kind!r}")
+
+
+class _Lagger:
+    """The lag step. Its state is an attribute, not a closure cell, so copy.deepcopy snapshots it."""
+
+    def __init__(self, k, combine):
+        self.k = k
+        self.combine = combine
+        self.tail = None  # the last k elements seen so far
+
+    def __call__(self, chunk):
+        k = self.k
+        joined = chunk if self.tail is None else np.concatenate((self.tail, chunk))
+        self.tail = joined[-k:].copy()
+        if len(joined) <= k:
+            return joined[:0]
+        return np.asarray(self.combine(joined[:-k], joined[k:]))
@@ -0,0 +1,246 @@
+"""Filter-and-aggregate queries straight on a DataFrame's column buffers.
+
+The `get_high_horsepower_mpgs` answer zips `mpg` and `hp`, builds a tuple per
+car and calls two Python lambdas on it. Here the same question is
+
+    Query(cars, mpg="Miles_per_Gallon", hp="Horsepower").where("hp**2 > 10300").max("mpg")
+
+The predicate is evaluated once over whole columns, giving a boolean mask. The
+aggregate is a masked numpy reduction (`np.max(..., where=mask)`), so the
+selected values are never copied out. Columns are taken with `to_numpy()`,
+which for numeric columns is a view of the DataFrame's own buffer, not a copy.
+NaNs in the aggregated column are skipped, like `np.nanmax`.
+
+`Records` holds aligned columns like `places` and `temps` as one table, each
+column a contiguous typed array (so a row costs its raw field bytes, not a
+tuple of boxed Python objects):
+
+    sea = Records(place=places, temp=temps)
+    for row in sea:                          # each row a small view, read field by field
+        print(row.place, row.temp)
+    print(sea.to_text("in {place}, the sea temperature is {temp:.1f}"))   # all lines at once
+"""
+
+import copy
+import re
+import string
+
+import numpy as np
+
+
+def column_views(frame, **aliases):
+    """Zero-copy numpy views of some DataFrame columns, e.g. column_views(cars, hp="Horsepower")."""
+    names = aliases or {name: name for name in frame.columns}
+    return {alias: frame[name].to_numpy() for alias, name in names.items()}
+
+
+def evaluate(predicate, columns):
+    """A boolean mask from a string expression over the column names, or a function of the columns."""
+    if isinstance(predicate, str):
+        selected = eval(predicate, {"__builtins__": {}, "np": np}, dict(columns))
+    else:
+        selected = predicate(columns)
+    return np.asarray(selected, dtype=bool)
+
+
+def _extreme(dtype, largest):
+    """The `initial` for a masked max/min: ±inf for floats, the dtype's own limit for integers."""
+    if dtype.kind in "iu":
+        info = np.iinfo(dtype)
+        return info.max if largest else info.min
+    return np.inf if largest else -np.inf
+
+
+class Query:
+    """A chain of `where` conditions on some columns, finished by an aggregate.
+
+    Predicates are either a string expression over the column names (evaluated
+    with `np` available, so only use expressions you trust) or a function
+    taking the dict of columns. Conditions from several `where`s are and-ed.
+    """
+
+    def __init__(self, frame, **aliases):
+        self.columns = column_views(frame, **aliases)
+        self.mask = None
+
+    def where(self, predicate):
+        selected = evaluate(predicate, self.columns)
+        query = copy.copy(self)
+        query.mask = selected if self.mask is None else self.mask & selected
+        return query
+
+    def _selection(self, column):
+        values = self.columns[column]
+        keep = ~np.isnan(values) if values.dtype.kind in "fc" else np.ones(len(values), dtype=bool)
+        if self.mask is not None:
+            keep &= self.mask
+        return values, keep
+
+    def count(self, column):
+        return int(self._selection(column)[1].sum())
+
+    def sum(self, column):
+        values, keep = self._selection(column)
+        return np.sum(values, where=keep)
+
+    def mean(self, column):
+        values, keep = self._selection(column)
+        return np.mean(values, where=keep) if keep.any() else np.nan
+
+    def std(self, column):
+        values, keep = self._selection(column)
+        return np.std(values, where=keep) if keep.any() else np.nan
+
+    def max(self, column):
+        values, keep = self._selection(column)
+        return np.max(values, where=keep, initial=_extreme(values.dtype, False)) if keep.any() else np.nan
+
+    def min(self, column):
+        values, keep = self._selection(column)
+        return np.min(values, where=keep, initial=_extreme(values.dtype, True)) if keep.any() else np.nan
+
+    def agg(self, how, column):
+        """e.g. agg("max", "mpg")"""
+        return getattr(self, how)(column)
+
+
+class Row:
+    """A view of one row of a `Records`: fields are read from the columns on access."""
+
+    __slots__ = ("_records", "_index")
+
+    def __init__(self, records, index):
+        self._records = records
+        self._index = index
+
+    def __getattr__(self, name):
+        if name.startswith("_"):  # an unset slot (e.g. while copy.copy builds a Row): don't look it up again
+            raise AttributeError(name)
+        try:
+            return self._records.columns[name][self._index]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __getitem__(self, name):
+        return self._records.columns[name][self._index]
+
+    def __iter__(self):
+        for column in self._records.columns.values():
+            yield column[self._index]
+
+    def as_tuple(self):
+        return tuple(self)
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={column[self._index]!r}" for name, column in self._records.columns.items())
+        return f"Row({fields})"
+
+
+class Records:
+    """Aligned columns stored as one contiguous typed array each (struct of arrays).
+
+    `records["temp"]` is the column itself, not a copy. Indexing with an int
+    gives a `Row`; a slice, a boolean mask or an array of indices gives a new
+    `Records` of those rows.
+    """
+
+    def __init__(self, **columns):
+        self.columns = {name: np.asarray(values) for name, values in columns.items()}
+        lengths = {len(column) for column in self.columns.values()}
+        if len(lengths) > 1:
+            raise ValueError(f"columns have different lengths: {sorted(lengths)}")
+
+    @classmethod
+    def from_rows(cls, rows, names):
+        """Records from row tuples (the output of a zip), one column per name."""
+        columns = list(zip(*rows)) or [()] * len(names)
+        return cls(**dict(zip(names, columns)))
+
+    @classmethod
+    def from_frame(cls, frame, **aliases):
+        """Records sharing a DataFrame's column buffers, e.g. from_frame(cars, mpg="Miles_per_Gallon")."""
+        return cls(**column_views(frame, **aliases))
+
+    def __len__(self):
+        return len(next(iter(self.columns.values()), ()))
+
+    @property
+    def names(self):
+        return tuple(self.columns)
+
+    @property
+    def nbytes(self):
+        return sum(column.nbytes for column in self.columns.values())
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self.columns[key]
+        if isinstance(key, (int, np.integer)):
+            if key < 0:
+                key += len(self)
+            if not 0 <= key < len(self):
+                raise IndexError("Records index out of range")
+            return Row(self, key)
+        return Records(**{name: column[key] for name, column in self.columns.items()})
+
+    def __iter__(self):
+        """The rows, each a `Row` (two slots: no values are copied until a field is read)."""
+        for index in range(len(self)):
+            yield Row(self, index)
+
+    def to_text(self, template, sep="\n"):
+        """template.format(**row) for every row, joined by `sep`: all the lines of a print loop at once.
+
+        When every field's format spec has a printf equivalent ("{temp}",
+        "{temp:.1f}", "{place:>12}"), the whole text is one `%` formatting
+        call over all the rows.
+        """
+        fields, printf = [], []
+        for literal, field, spec, conversion in string.Formatter().parse(template):
+            printf.append(literal.replace("%", "%%"))
+            if field is None:
+                continue
+            fields.append(field)
+            converted = None if conversion else _printf_spec(spec, self.columns[field].dtype.kind)
+            if converted is None:
+                return sep.join(template.format(**dict(zip(self.names, row))) for row in self._value_rows())
+            printf.append(converted)
+        if len(self) == 0:
+            return ""
+        values = np.empty((len(self), len(fields)), dtype=object)
+        for i, field in enumerate(fields):
+            values[:, i] = self.columns[field].tolist()
+        return ((("".join(printf) + sep) * len(self)) % tuple(values.ravel().tolist()))[:-len(sep) or None]
+
+    def _value_rows(self):
+        return zip(*(column.tolist() for column in self.columns.values()))
+
+    def to_structured(self):
+        """The same rows as a numpy structured array (one packed record per row)."""
+        return np.rec.fromarrays(list(self.columns.values()), names=list(self.columns))
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}: {column.dtype}" for name, column in self.columns.items())
+        return f"Records({len(self)} rows; {fields})"
+
+
+_PRINTF_SPEC = re.compile(r"(?P<align>[<>]?)(?P<width>\d*)(?P<precision>\.\d+)?(?P<type>[sdfeEgGxXo]?)")
+
+
+def _printf_spec(spec, dtype_kind):
+    """The printf conversion for a str.format spec on a column of `dtype_kind`, or None if there isn't an exact one."""
+    match = _PRINTF_SPEC.fullmatch(spec)
+    if match is None:
+        return None
+    align, width, precision, kind = match.groups()
+    if kind in ("d", "x", "X", "o") and dtype_kind not in "biu":
+        return None  # "%d" truncates 1.7 to 1, where format raises: leave floats and strings to format
+    if precision and not kind and dtype_kind not in "SU":
+        return None  # "{:.2}" of a number is significant digits ("1.6e+01"); "%.2s" would cut the text to "16"
+    if align == "<" or (width and not align and kind == "s"):
+        align = "-"  # format left-aligns strings by default, printf right-aligns everything
+    elif width and not align and not kind:
+        return None  # the alignment depends on whether each value is a str or a number
+    else:
+        align = ""
+    return f"%{align}{width}{precision or ''}{kind or 's'}"
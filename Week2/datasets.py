@@ -0,0 +1,103 @@
+"""Download a dataset once, then load it from a local column cache.
+
+`pd.read_json(url)` goes to the network every time the notebook runs, and
+doesn't work at all without a connection. `load_cars()` fetches the JSON once
+and saves every column as its own `.npy` file, in a folder named after a hash of
+the URL. A `manifest.json` in that folder records where the data came from and
+the hash of the downloaded bytes. Later loads memory-map those files, so
+there is no network round trip and no JSON parsing. Numeric columns of the
+DataFrame are the memory maps themselves; text columns are read into memory.
+
+With no network at all, point `fixture` at a local copy of the file (JSON or
+CSV), and it is cached the same way. The fixture is re-read and hashed on
+every load, and the cache is rebuilt when its contents no longer match the
+manifest.
+"""
+
+import hashlib
+import io
+import json
+import urllib.request
+from pathlib import Path
+
+import numpy as np
+
+CARS_URL = "https://raw.githubusercontent.com/vega/vega-datasets/master/data/cars.json"
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent / ".data_cache"
+
+
+def load_cars(cache_dir=DEFAULT_CACHE_DIR, fixture=None, refresh=False):
+    """The vega `cars` dataset as a DataFrame (see `load_dataset`)."""
+    return load_dataset(CARS_URL, cache_dir=cache_dir, fixture=fixture, refresh=refresh)
+
+
+def load_dataset(url, cache_dir=DEFAULT_CACHE_DIR, fixture=None, refresh=False):
+    """Load the JSON/CSV table at `url`, downloading it only if it isn't cached yet.
+
+    `fixture` is a local file used instead of the URL. `refresh=True` ignores
+    the cache and fetches (or re-reads the fixture) again.
+    """
+    key_source = str(Path(fixture).resolve()) if fixture is not None else url
+    folder = Path(cache_dir) / hashlib.sha256(key_source.encode()).hexdigest()[:16]
+    manifest_path = folder / "manifest.json"
+    # a local fixture is cheap to re-read, so its cache is only used while the file's contents still match
+    raw = Path(fixture).read_bytes() if fixture is not None else None
+    digest = hashlib.sha256(raw).hexdigest() if raw is not None else None
+    if not refresh and manifest_path.exists():
+        if digest is None or json.loads(manifest_path.read_text())["sha256"] == digest:
+            return _read_cache(folder)
+    import pandas as pd  # only needed here, and slow to import (see startup.py)
+
+    if raw is None:
+        raw = _fetch(url)
+        digest = hashlib.sha256(raw).hexdigest()
+    name = str(fixture if fixture is not None else url)
+    frame = pd.read_csv(io.BytesIO(raw)) if name.endswith(".csv") else pd.read_json(io.BytesIO(raw))
+    _write_cache(folder, frame, source=key_source, digest=digest)
+    return _read_cache(folder)
+
+
+def _fetch(url):
+    try:
+        with urllib.request.urlopen(url, timeout=30) as response:
+            return response.read()
+    except OSError as error:
+        raise OSError(f"couldn't download {url} and it isn't cached yet; "
+                      f"pass fixture=<path to a local copy> to work offline") from error
+
+
+def _write_cache(folder, frame, source, digest):
+    folder.mkdir(parents=True, exist_ok=True)
+    (folder / "manifest.json").unlink(missing_ok=True)  # the old cache is invalid from here on
+    columns = []
+    for i, name in enumerate(frame.columns):
+        column = frame[name]
+        entry = {"name": str(name), "file": f"{i}.npy"}
+        if column.dtype.kind in "biufcmM":
+            values = column.to_numpy()
+        else:
+            # strings are stored as fixed-width unicode, which (unlike object arrays) can be memory-mapped.
+            # "" stands in for a missing value there, and a mask says which ones were really missing
+            missing = column.isna().to_numpy()
+            values = column.fillna("").astype(str).to_numpy(dtype=str)
+            if missing.any():
+                entry["nulls"] = f"{i}.nulls.npy"
+                np.save(folder / entry["nulls"], missing)
+        np.save(folder / entry["file"], values)
+        columns.append(entry)
+    # the manifest is written last, so an interrupted write never looks like a valid cache
+    manifest = {"source": source, "sha256": digest, "rows": len(frame), "columns": columns}
+    (folder / "manifest.json").write_text(json.dumps(manifest, indent=1))
+
+
+def _read_cache(folder):
+    import pandas as pd
+
+    manifest = json.loads((folder / "manifest.json").read_text())
+    data = {c["name"]: np.load(folder / c["file"], mmap_mode="r") for c in manifest["columns"]}
+    # copy=False: numeric columns stay memory-mapped (pandas converts text columns to its own string dtype anyway)
+    frame = pd.DataFrame(data, copy=False)
+    for c in manifest["columns"]:
+        if "nulls" in c:
+            frame[c["name"]] = frame[c["name"]].mask(np.load(folder / c["nulls"]))
+    return frame
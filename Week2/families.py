@@ -0,0 +1,134 @@
+"""Families of functions, evaluated for every member and every input at once.
+
+    def pow_iter(set):
+        return (lambda x: x**n for n in set)
+
+builds one closure per exponent, and each closure handles one number per call.
+Evaluating 10**4 exponents on 10**6 inputs that way is 10**10 Python calls.
+The closures also *late-bind* `n`: they look it up when they are called, not
+when they are made, so `[f(2) for f in list(pow_iter({1, 2, 5}))]` is
+`[32, 32, 32]`.
+
+A `FunctionFamily` is the family {x → kernel(x, p) : p ∈ params} as one
+vectorised kernel. Calling it on a batch of inputs gives a table with one row
+per input and one column per member, from a single broadcast:
+
+    powers = PowerFamily({1, 2, 5})
+    powers(2)                    # array([ 2,  4, 32])
+    powers(np.arange(4))         # x[:, None] ** n[None, :]
+
+The full table for 10**6 inputs and 10**4 members would be 80 GB, so `reduce`
+and `blocks` work through the inputs in blocks of rows, each one broadcast,
+that fit in `max_bytes`. Members taken out one at a time (`family[i]`, or
+iterating) have their parameter bound when they are made.
+"""
+
+import numpy as np
+
+DEFAULT_MAX_BYTES = 1 << 26
+
+_UFUNCS = {"sum": np.add, "max": np.maximum, "min": np.minimum}
+
+
+class FunctionFamily:
+    """{x → kernel(x, p) : p ∈ params}. `kernel` must broadcast over x and p."""
+
+    def __init__(self, kernel, params):
+        if isinstance(params, (set, frozenset)):
+            params = sorted(params)  # sets have no order, the columns need one
+        self.kernel = kernel
+        self.params = np.asarray(list(params))
+        if self.params.ndim != 1:
+            raise ValueError("params must be one-dimensional")
+
+    def __len__(self):
+        return len(self.params)
+
+    def __call__(self, x):
+        """kernel(x, p) for every p: shape x.shape + (len(self),)."""
+        x = np.asarray(x)
+        return self.kernel(x[..., None], self.params)
+
+    def __getitem__(self, i):
+        p = self.params[i]
+        return lambda x, p=p: self.kernel(x, p)  # p is bound now, not at call time
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def blocks(self, x, max_bytes=DEFAULT_MAX_BYTES):
+        """Yield (start, table) for blocks of the inputs, each table at most about `max_bytes`."""
+        x = np.asarray(x)
+        if x.ndim != 1:
+            raise ValueError("blocks() takes a one-dimensional batch of inputs")
+        row_bytes = max(1, len(self)) * max(x.itemsize, 8)
+        rows = max(1, max_bytes // row_bytes)
+        for start in range(0, len(x), rows):
+            yield start, self(x[start:start + rows])
+
+    def reduce(self, x, how="sum", axis=None, max_bytes=DEFAULT_MAX_BYTES):
+        """Sum, max or min of the table without ever holding all of it.
+
+        axis=0 reduces over the inputs (one value per member), axis=1 over the
+        members (one value per input), and axis=None over both.
+        """
+        if how not in _UFUNCS:
+            raise ValueError(f"how must be one of {sorted(_UFUNCS)}")
+        if axis not in (None, 0, 1):
+            raise ValueError("axis must be None, 0 or 1")
+        ufunc = _UFUNCS[how]
+        if axis == 1:
+            parts = [ufunc.reduce(table, axis=1) for _, table in self.blocks(x, max_bytes)]
+            return np.concatenate(parts) if parts else np.empty(0)
+        result = None
+        for _, table in self.blocks(x, max_bytes):
+            part = ufunc.reduce(table, axis=0)
+            result = part if result is None else ufunc(result, part)
+        if result is None:
+            if how != "sum":
+                raise ValueError(f"{how}() of an empty batch")
+            result = np.zeros(len(self))
+        return result if axis == 0 else ufunc.reduce(result)
+
+    def __repr__(self):
+        name = getattr(self.kernel, "__name__", repr(self.kernel))
+        return f"{type(self).__name__}({name}, {len(self)} members)"
+
+
+class PowerFamily(FunctionFamily):
+    """{x → x**n : n ∈ exponents}, the family `pow_iter` builds.
+
+    For float inputs and whole-number exponents, each column after a
+    non-negative exponent is the previous one times x**gap (a multiply instead
+    of a `pow`, 5-10x faster), restarting from an exact np.power every `ANCHOR`
+    columns so rounding stays within a few dozen ulps.
+    """
+
+    ANCHOR = 64
+
+    def __init__(self, exponents):
+        super().__init__(np.power, exponents)
+        n = self.params
+        self._ladder = (len(n) > 1 and n.dtype.kind in "biuf"
+                        and bool(np.all(np.isfinite(n) & (n == np.trunc(n)))))
+
+    def __call__(self, x):
+        x = np.asarray(x)
+        if not self._ladder or x.dtype.kind not in "fc":
+            return super().__call__(x)
+        n = self.params
+        table = np.empty((len(n),) + x.shape, dtype=np.result_type(x, n))
+        np.power(x, n[0], out=table[0, ...])
+        for k in range(1, len(n)):
+            gap = n[k] - n[k - 1]
+            # after a negative exponent the previous column can be inf (x = 0) or 0 (x = inf), and then
+            # multiplying by x gives nan instead of x**n: the ladder only climbs from non-negative exponents
+            if k % self.ANCHOR == 0 or gap < 0 or n[k - 1] < 0:
+                np.power(x, n[k], out=table[k, ...])
+            else:
+                np.multiply(table[k - 1, ...], x if gap == 1 else x**gap, out=table[k, ...])
+        return np.moveaxis(table, 0, -1)
+
+    def __repr__(self):
+        return f"PowerFamily({self.params.tolist()!r})" if len(self) <= 8 else f"PowerFamily({len(self)} exponents)"
@@ -0,0 +1,222 @@
+"""Pass arrays to functions without letting them change the caller's data.
+
+`change_array(an_array)` appends to the caller's list, because the function
+gets a reference to the same object. The usual defence is to pass
+`an_array.copy()`, which costs O(n) time and memory at every call, even when the
+function only reads. Instead:
+
+- `freeze(array)` is a read-only view of the same memory (no copy). Writing to
+  it raises an error instead of silently changing the caller's data.
+- `CopyOnWrite(array)` reads from that view too, but copies the buffer the first
+  time it is written to, so the caller's array is never touched.
+- `@pure` hands every numpy argument to a function as one of these.
+- Inside `with track_copies() as ledger:`, all of the above count how many bytes
+  defensive copies would have cost, and how many were really copied.
+
+    with track_copies() as ledger:
+        total = pure(np.sum)(np.zeros(10**6))
+    ledger   # CopyLedger(shared 1 arrays / 7.6 MB, copied 0 arrays / 0 B)
+
+A read-only view guards against mistakes, not malice: code that really wants
+to can set `flags.writeable = True` again.
+"""
+
+import functools
+from contextlib import contextmanager
+
+import numpy as np
+from numpy.lib.mixins import NDArrayOperatorsMixin
+
+_LEDGERS = []
+
+
+def _human(nbytes):
+    for unit in ("B", "KB", "MB", "GB"):
+        if nbytes < 1024 or unit == "GB":
+            return f"{nbytes:.1f} {unit}" if unit != "B" else f"{nbytes} B"
+        nbytes /= 1024
+
+
+class CopyLedger:
+    """What defensive copying would have cost, against what copy-on-write really copied."""
+
+    def __init__(self):
+        self.shared = 0
+        self.bytes_shared = 0
+        self.copies = 0
+        self.bytes_copied = 0
+
+    @property
+    def bytes_saved(self):
+        return self.bytes_shared - self.bytes_copied
+
+    def __repr__(self):
+        return (f"CopyLedger(shared {self.shared} arrays / {_human(self.bytes_shared)}, "
+                f"copied {self.copies} arrays / {_human(self.bytes_copied)})")
+
+
+@contextmanager
+def track_copies():
+    """Count shared and copied bytes until the block ends (ledgers can be nested)."""
+    ledger = CopyLedger()
+    _LEDGERS.append(ledger)
+    try:
+        yield ledger
+    finally:
+        _LEDGERS.remove(ledger)
+
+
+def _record(kind, nbytes):
+    for ledger in _LEDGERS:
+        if kind == "shared":
+            ledger.shared += 1
+            ledger.bytes_shared += nbytes
+        else:
+            ledger.copies += 1
+            ledger.bytes_copied += nbytes
+
+
+def freeze(array):
+    """A read-only view of `array`, sharing its memory."""
+    view = np.asarray(array).view()
+    view.flags.writeable = False
+    _record("shared", view.nbytes)
+    return view
+
+
+# ndarray methods that change the array in place
+_IN_PLACE_METHODS = frozenset({"fill", "itemset", "partition", "put", "resize", "setfield", "sort"})
+
+
+def _unwrap(value):
+    if isinstance(value, CopyOnWrite):
+        return value._data
+    if isinstance(value, (list, tuple)):
+        return type(value)(_unwrap(item) for item in value)
+    return value
+
+
+class CopyOnWrite(NDArrayOperatorsMixin):
+    """An array that shares the caller's memory until it is first written to.
+
+    It behaves like an ndarray: arithmetic, ufuncs, numpy functions and
+    ndarray methods and attributes (`x.sum()`, `x.T`) all read a read-only
+    view, and give plain ndarrays back. Writes -- `x[i] = v`, `x += 1`,
+    `out=x`, `x.sort()`, `append` and `writable()` -- first give this wrapper
+    its own copy, so the original array never changes.
+    """
+
+    __slots__ = ("_data", "_owned")
+
+    def __init__(self, array):
+        self._data = freeze(array)
+        self._owned = False
+
+    def _own(self):
+        if not self._owned:
+            self._data = self._data.copy()
+            self._owned = True
+            _record("copied", self._data.nbytes)
+        return self._data
+
+    @property
+    def copied(self):
+        """True once this wrapper has its own buffer."""
+        return self._owned
+
+    @property
+    def data(self):
+        """The current values: read-only until the first write."""
+        return self._data
+
+    def writable(self):
+        """A writeable array for in-place numpy operations (copying on first use)."""
+        return self._own()
+
+    def __setitem__(self, key, value):
+        self._own()[key] = value
+
+    def append(self, values):
+        """Like list.append: a new, bigger buffer of our own (np.append always copies)."""
+        if not self._owned:
+            _record("copied", self._data.nbytes)
+        self._data = np.append(self._data, values)
+        self._owned = True
+
+    # --- numpy protocols ---
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        out = kwargs.get("out")
+        if out:
+            # writing into a wrapper (x += 1, np.add(x, 1, out=x)): into its own copy
+            kwargs["out"] = tuple(item._own() if isinstance(item, CopyOnWrite) else item for item in out)
+        result = getattr(ufunc, method)(*_unwrap(inputs), **kwargs)
+        if out:
+            return out[0] if len(out) == 1 else out
+        return result
+
+    def __array_function__(self, func, types, args, kwargs):
+        if isinstance(kwargs.get("out"), CopyOnWrite):
+            kwargs = {**kwargs, "out": kwargs["out"]._own()}
+        return func(*_unwrap(args), **{name: _unwrap(value) for name, value in kwargs.items()})
+
+    def __getattr__(self, name):
+        # only called for names not found on the wrapper: everything else ndarray has
+        if name.startswith("_"):
+            raise AttributeError(name)
+        if name in _IN_PLACE_METHODS:
+            return getattr(self._own(), name)
+        return getattr(self._data, name)
+
+    # --- reading ---
+
+    def __array__(self, dtype=None, copy=None):
+        if copy:
+            return np.array(self._data, dtype=dtype)
+        return self._data if dtype is None else self._data.astype(dtype, copy=False)
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __len__(self):
+        return len(self._data)
+
+    def __iter__(self):
+        return iter(self._data)
+
+    @property
+    def shape(self):
+        return self._data.shape
+
+    @property
+    def dtype(self):
+        return self._data.dtype
+
+    @property
+    def nbytes(self):
+        return self._data.nbytes
+
+    def __repr__(self):
+        state = "own copy" if self._owned else "shared"
+        return f"CopyOnWrite({np.array2string(self._data, threshold=8)}, {state})"
+
+
+def pure(func=None, *, copy_on_write=False):
+    """Decorator: numpy array arguments are passed read-only (or as `CopyOnWrite`).
+
+    With the default, a function that tries to write to an argument raises
+    `ValueError: assignment destination is read-only`. With
+    `copy_on_write=True` it gets its own copy of whatever it writes to.
+    """
+    if func is None:
+        return functools.partial(pure, copy_on_write=copy_on_write)
+    protect = CopyOnWrite if copy_on_write else freeze
+
+    def guard(value):
+        return protect(value) if isinstance(value, np.ndarray) else value
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return func(*map(guard, args), **{name: guard(value) for name, value in kwargs.items()})
+
+    return wrapper
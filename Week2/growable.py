@@ -0,0 +1,111 @@
+"""A numpy array you can append to cheaply.
+
+`np.append(better_array, 45)` copies the whole array to add one element, so
+building an array of n readings one at a time costs O(n^2). `GrowableArray`
+keeps spare room at the end of its buffer. When the buffer fills up it doubles
+in size, so each element is copied O(1) times on average.
+
+    readings = GrowableArray()
+    for reading in stream:
+        readings.append(reading)
+    readings.view()     # the readings so far, without copying
+    readings.freeze()   # an exact-size array, once you're done
+"""
+
+from collections.abc import Sequence
+
+import numpy as np
+
+
+class GrowableArray:
+    """A 1-d numpy buffer with amortised O(1) `append` and `extend`."""
+
+    __slots__ = ("_buffer", "_size")
+
+    def __init__(self, dtype=np.float64, capacity=16):
+        self._buffer = np.empty(max(1, capacity), dtype=dtype)
+        self._size = 0
+
+    @classmethod
+    def from_array(cls, array, dtype=None):
+        array = np.asarray(array)
+        grown = cls(dtype or array.dtype, capacity=len(array))
+        grown.extend(array)
+        return grown
+
+    @property
+    def dtype(self):
+        return self._buffer.dtype
+
+    @property
+    def capacity(self):
+        return len(self._buffer)
+
+    def __len__(self):
+        return self._size
+
+    def _reserve(self, needed):
+        if needed <= len(self._buffer):
+            return
+        capacity = len(self._buffer)
+        while capacity < needed:
+            capacity *= 2
+        bigger = np.empty(capacity, dtype=self._buffer.dtype)
+        bigger[:self._size] = self._buffer[:self._size]
+        self._buffer = bigger
+
+    def append(self, value):
+        if self._size == len(self._buffer):
+            self._reserve(self._size + 1)
+        self._buffer[self._size] = value
+        self._size += 1
+
+    def extend(self, values):
+        """Append many values.
+
+        Arrays and sequences are copied in one go, sets and other sized
+        iterables with one `np.fromiter`, and iterators element by element.
+        """
+        if not isinstance(values, (np.ndarray, Sequence)) and not hasattr(values, "__array__"):
+            if not hasattr(values, "__len__"):
+                for value in values:
+                    self.append(value)
+                return
+            # a set (or dict view...): np.asarray would make a 0-d object array of it
+            values = np.fromiter(values, dtype=self._buffer.dtype, count=len(values))
+        values = np.asarray(values, dtype=self._buffer.dtype)
+        self._reserve(self._size + len(values))
+        self._buffer[self._size:self._size + len(values)] = values
+        self._size += len(values)
+
+    def view(self):
+        """The filled part of the buffer, as a view (no copy).
+
+        Don't hold on to it across appends: the buffer is replaced when it grows.
+        """
+        return self._buffer[:self._size]
+
+    def freeze(self):
+        """An exact-size array with the contents. The GrowableArray is emptied."""
+        if self._size == len(self._buffer):
+            frozen = self._buffer
+        else:
+            frozen = self._buffer[:self._size].copy()
+        self._buffer = np.empty(1, dtype=frozen.dtype)
+        self._size = 0
+        return frozen
+
+    def __getitem__(self, index):
+        return self.view()[index]
+
+    def __iter__(self):
+        return iter(self.view().tolist())
+
+    def __array__(self, dtype=None, copy=None):
+        # copy=True (np.array's default) must give an independent array, not a view of this one
+        if dtype is None:
+            return self.view().copy() if copy else self.view()
+        return self.view().astype(dtype, copy=bool(copy))
+
+    def __repr__(self):
+        return f"GrowableArray({self.view()!r}, capacity={self.capacity})"
@@ -0,0 +1,214 @@
+"""Aggregates that keep up with a growing dataset, without starting again.
+
+Each time a reading is added to `temperatures_fahrenheit`, `hot_days()` and
+`temp_differences()` are re-created and walk the whole history again. A view
+instead keeps a small state (a count, a `RunningStats`, a maximum, and the tail
+a lag needs) and only processes what was appended:
+
+    hot_day_count = IncrementalView("count").map(celsius_converter).filter(lambda x: x > 25)
+    difference_stats = IncrementalView("stats").map(celsius_converter).diff()
+    for view in (hot_day_count, difference_stats):
+        view.append(temperatures_fahrenheit)      # the history so far
+        view.append(new_readings)                 # later: O(len(new_readings))
+    hot_day_count.value, difference_stats.value.std
+
+The stages are `ChunkedStream`'s (map, filter, lag, diff, rolling, ewm), run on
+each appended chunk. `IncrementalQuery` is the same for a `Query` over several
+columns, like the max mpg of the cars that pass a horsepower condition.
+
+`snapshot()` returns a copy of the state, and `restore()` goes back to it.
+Views over separate sources (two weather stations, say) can be combined with
+`merge`: the aggregates are combined, the lag tails of the first view are kept.
+"""
+
+import copy
+
+import numpy as np
+
+from chunked import StageBuilder, make_step
+from columns import evaluate
+from series import NeumaierSum, _compensated_chunk_sum
+from streaming_stats import RunningStats
+
+
+# --- mergeable aggregates ---
+
+class _Count:
+    def __init__(self):
+        self.value = 0
+
+    def update(self, chunk):
+        self.value += len(chunk)
+
+    def merge(self, other):
+        self.value += other.value
+
+
+class _Sum:
+    def __init__(self):
+        self.total = NeumaierSum()
+
+    @property
+    def value(self):
+        return self.total.value
+
+    def update(self, chunk):
+        # compensated within the chunk too: float(np.sum(chunk)) would round before the accumulator saw it
+        _compensated_chunk_sum(chunk, self.total)
+
+    def merge(self, other):
+        self.total.add(other.total.total)
+        self.total.add(other.total.compensation)
+
+
+class _Stats:
+    def __init__(self):
+        self.value = RunningStats()
+
+    def update(self, chunk):
+        self.value.update_chunk(np.asarray(chunk, dtype=np.float64))
+
+    def merge(self, other):
+        self.value = self.value.merge(other.value)
+
+
+class _Extreme:
+    def __init__(self, largest):
+        self.largest = largest
+        self.best = None
+
+    @property
+    def value(self):
+        return np.nan if self.best is None else self.best  # like Query, nan when nothing is selected
+
+    def update(self, chunk):
+        if len(chunk):
+            best = chunk.max() if self.largest else chunk.min()
+            if self.best is not None:
+                best = max(self.best, best) if self.largest else min(self.best, best)
+            self.best = best
+
+    def merge(self, other):
+        if other.best is not None:
+            self.update(np.array([other.best]))
+
+
+AGGREGATES = {
+    "count": _Count,
+    "sum": _Sum,
+    "stats": _Stats,
+    "max": lambda: _Extreme(True),
+    "min": lambda: _Extreme(False),
+}
+
+
+def _aggregate(how):
+    if how not in AGGREGATES:
+        raise ValueError(f"aggregate must be one of {sorted(AGGREGATES)}")
+    return AGGREGATES[how]()
+
+
+class _Snapshots:
+    """snapshot / restore for views whose whole state is in `_STATE` attributes."""
+
+    _STATE = ()
+
+    def snapshot(self):
+        return copy.deepcopy({name: getattr(self, name) for name in self._STATE})
+
+    def restore(self, snapshot):
+        for name, value in copy.deepcopy(snapshot).items():
+            setattr(self, name, value)
+        return self
+
+
+# --- views ---
+
+class IncrementalView(StageBuilder, _Snapshots):
+    """Map/filter/lag stages feeding one aggregate, updated on every `append`.
+
+    `how` is "count", "sum", "stats" (a `RunningStats`), "max" or "min".
+    Adding a stage returns a new, empty view.
+    """
+
+    _STATE = ("_steps", "_aggregate", "appended")
+
+    def __init__(self, how="count", stages=()):
+        self.how = how
+        self.stages = tuple(stages)
+        self._steps = [make_step(kind, arg) for kind, arg in self.stages]
+        self._aggregate = _aggregate(how)
+        self.appended = 0
+
+    def _then(self, stage):
+        if self.appended:
+            raise ValueError("add stages before appending any data")
+        return IncrementalView(self.how, self.stages + (stage,))
+
+    def append(self, values):
+        """Fold in new readings (one value or an array), in O(len(values))."""
+        chunk = np.atleast_1d(np.asarray(values))
+        self.appended += len(chunk)
+        for step in self._steps:
+            chunk = step(chunk)
+            if len(chunk) == 0:
+                return self
+        self._aggregate.update(chunk)
+        return self
+
+    @property
+    def value(self):
+        return self._aggregate.value
+
+    def merge(self, other):
+        """A new view with both aggregates combined (for views over separate sources)."""
+        if (other.how, len(other.stages)) != (self.how, len(self.stages)):
+            raise ValueError("can only merge views with the same stages and aggregate")
+        merged = copy.deepcopy(self)
+        merged._aggregate.merge(other._aggregate)
+        merged.appended += other.appended
+        return merged
+
+    def __repr__(self):
+        kinds = " -> ".join(kind for kind, _ in self.stages) or "source"
+        return f"IncrementalView({kinds} -> {self.how}, {self.appended} appended)"
+
+
+class IncrementalQuery(_Snapshots):
+    """`Query(...).where(predicate).<how>(column)`, kept up to date as rows are appended.
+
+    NaNs in `column` are skipped, like in `Query`.
+    """
+
+    _STATE = ("_aggregate", "appended")
+
+    def __init__(self, column, how="max", where=None):
+        self.column = column
+        self.how = how
+        self.where = where
+        self._aggregate = _aggregate(how)
+        self.appended = 0
+
+    def append(self, **columns):
+        """Fold in new rows, given as arrays (or single values) per column name."""
+        columns = {name: np.atleast_1d(np.asarray(values)) for name, values in columns.items()}
+        values = columns[self.column]
+        self.appended += len(values)
+        keep = evaluate(self.where, columns) if self.where is not None else np.ones(len(values), dtype=bool)
+        if values.dtype.kind in "fc":
+            keep &= ~np.isnan(values)
+        self._aggregate.update(values[keep])
+        return self
+
+    @property
+    def value(self):
+        return self._aggregate.value
+
+    def merge(self, other):
+        merged = copy.deepcopy(self)
+        merged._aggregate.merge(other._aggregate)
+        merged.appended += other.appended
+        return merged
+
+    def __repr__(self):
+        return f"IncrementalQuery({self.how}({self.column!r}) where {self.where!r}, {self.appended} appended)"
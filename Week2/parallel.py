@@ -0,0 +1,196 @@
+"""Run pure map/filter/reduce stages on all cores.
+
+The notebook points out that pure pipelines are "easily parallelisable". Here
+is how: the input array is copied once into shared memory, each worker process
+attaches to it by name and works on its own slice, and only small things
+(slice bounds, counts, partial results) are ever sent between processes. The
+data itself is never pickled.
+
+    celsius = parallel_map(celsius_converter, temperatures_fahrenheit)
+    hot = parallel_filter(is_hot, celsius)
+    stats = parallel_reduce(temperatures_fahrenheit, "stats", stage=celsius_converter)  # a RunningStats
+
+Functions are sent to the workers by pickling, so they have to be defined at
+module level (not lambdas, and not functions defined inside a notebook cell).
+Every stage runs on one slice at a time, so it must be elementwise: a lag or
+diff would need the neighbouring slice.
+"""
+
+import functools
+import operator
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from streaming_stats import RunningStats
+
+
+class SharedArray:
+    """A numpy array living in a named shared-memory block.
+
+    Use as a context manager, so the block is released when you are done.
+    """
+
+    def __init__(self, shape, dtype, name=None):
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        size = max(1, int(np.prod(self.shape)) * self.dtype.itemsize)
+        self.owner = name is None
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner, size=size)
+        self.array = np.ndarray(self.shape, dtype=self.dtype, buffer=self.shm.buf)
+
+    @classmethod
+    def copy_of(cls, array):
+        shared = cls(array.shape, array.dtype)
+        shared.array[...] = array
+        return shared
+
+    @property
+    def spec(self):
+        """What a worker needs to re-attach: (name, shape, dtype)."""
+        return self.shm.name, self.shape, self.dtype.str
+
+    def close(self):
+        del self.array  # drop our view before closing the buffer it points into
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# --- what runs in the workers ---
+
+def _with_slice(spec, start, stop, work):
+    shared = SharedArray(spec[1], spec[2], name=spec[0])
+    try:
+        return work(shared.array[start:stop])
+    finally:
+        shared.close()
+
+
+def _map_task(spec, out_spec, start, stop, func):
+    def work(chunk):
+        out = SharedArray(out_spec[1], out_spec[2], name=out_spec[0])
+        try:
+            out.array[start:stop] = func(chunk)
+        finally:
+            out.close()
+
+    _with_slice(spec, start, stop, work)
+
+
+def _filter_task(spec, out_spec, start, stop, predicate):
+    # the kept values go at the start of this worker's own region of the output
+    def work(chunk):
+        kept = chunk[np.asarray(predicate(chunk), dtype=bool)]
+        out = SharedArray(out_spec[1], out_spec[2], name=out_spec[0])
+        try:
+            out.array[start:start + len(kept)] = kept
+        finally:
+            out.close()
+        return len(kept)
+
+    return _with_slice(spec, start, stop, work)
+
+
+def _reduce_task(spec, start, stop, stage, reduce_chunk):
+    def work(chunk):
+        if stage is not None:
+            chunk = stage(chunk)
+        return reduce_chunk(chunk)
+
+    return _with_slice(spec, start, stop, work)
+
+
+# --- associative reductions: (per-chunk reduction, how to combine two partial results) ---
+
+def _stats_of(chunk):
+    return RunningStats().update_chunk(chunk)
+
+
+def _max_of(chunk):
+    return chunk.max() if len(chunk) else -np.inf
+
+
+def _min_of(chunk):
+    return chunk.min() if len(chunk) else np.inf
+
+
+REDUCTIONS = {
+    "sum": (np.sum, operator.add),
+    "count": (len, operator.add),
+    "max": (_max_of, max),
+    "min": (_min_of, min),
+    "stats": (_stats_of, RunningStats.merge),
+}
+
+
+def _bounds(n, workers, chunk_size):
+    if chunk_size is None:
+        chunk_size = max(1, -(-n // (workers * 4)))  # a few slices per worker, for load balancing
+    return [(start, min(start + chunk_size, n)) for start in range(0, n, chunk_size)]
+
+
+def _workers(workers):
+    return workers or os.cpu_count() or 1
+
+
+def parallel_map(func, array, workers=None, chunk_size=None, dtype=None):
+    """`func(array)`, computed slice by slice in worker processes.
+
+    `dtype` is the output type (defaults to the type of `func` on the first element).
+    """
+    array = np.asarray(array)
+    workers = _workers(workers)
+    if dtype is None:
+        dtype = np.asarray(func(array[:1])).dtype
+    with SharedArray.copy_of(array) as source, SharedArray(array.shape, dtype) as out:
+        with ProcessPoolExecutor(workers) as pool:
+            jobs = [pool.submit(_map_task, source.spec, out.spec, start, stop, func)
+                    for start, stop in _bounds(len(array), workers, chunk_size)]
+            for job in jobs:
+                job.result()
+        return out.array.copy()
+
+
+def parallel_filter(predicate, array, workers=None, chunk_size=None):
+    """The elements of `array` where the vectorised `predicate` is True, in order."""
+    array = np.asarray(array)
+    workers = _workers(workers)
+    bounds = _bounds(len(array), workers, chunk_size)
+    with SharedArray.copy_of(array) as source, SharedArray(array.shape, array.dtype) as out:
+        with ProcessPoolExecutor(workers) as pool:
+            jobs = [pool.submit(_filter_task, source.spec, out.spec, start, stop, predicate)
+                    for start, stop in bounds]
+            counts = [job.result() for job in jobs]
+        kept = np.concatenate([out.array[start:start + count] for (start, _), count in zip(bounds, counts)]
+                              or [array[:0]])
+    return kept
+
+
+def parallel_reduce(array, reduction, stage=None, workers=None, chunk_size=None):
+    """Reduce `array` across worker processes.
+
+    `reduction` is one of "sum", "count", "max", "min", "stats" (a RunningStats),
+    or a `(reduce_chunk, combine)` pair, where `combine` must be associative.
+    `stage` is an optional vectorised chunk -> chunk function (e.g. a conversion
+    followed by a mask) applied to each slice before it is reduced.
+    """
+    reduce_chunk, combine = REDUCTIONS[reduction] if isinstance(reduction, str) else reduction
+    array = np.asarray(array)
+    workers = _workers(workers)
+    with SharedArray.copy_of(array) as source:
+        with ProcessPoolExecutor(workers) as pool:
+            jobs = [pool.submit(_reduce_task, source.spec, start, stop, stage, reduce_chunk)
+                    for start, stop in _bounds(len(array), workers, chunk_size)]
+            partials = [job.result() for job in jobs]
+    if not partials:
+        return reduce_chunk(array)
+    return functools.reduce(combine, partials)
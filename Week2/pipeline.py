@@ -0,0 +1,324 @@
+"""Build a map/filter/zip/lag pipeline once, then run it as one fused loop.
+
+In the notebook, every stage of a pipeline is its own CPython iterator, and
+`temp_differences()` even converts every temperature to celsius twice (once
+for each side of the `zip`). A `Pipeline` only *records* the stages as a small
+expression graph:
+
+    temps = Pipeline.source()
+    celsius = temps.map(celsius_converter)
+    hot_days = celsius.filter(lambda x: x > 25)
+    temp_differences = celsius.zip(celsius.lag(1)).map(lambda today, tomorrow: tomorrow - today)
+
+and can then be run three ways:
+
+- `temp_differences.run_unfused(data)`: chained CPython iterators, exactly like
+  the notebook (shared stages are recomputed).
+- `temp_differences.compile()(data)`: generates one Python loop for the whole
+  graph. Each node is computed once per element, and identical nodes
+  (same function on the same input) are merged, so celsius is converted once.
+- `temp_differences.chunks(data)`: the same graph evaluated on numpy chunks.
+  Only valid if every function works on whole arrays.
+
+`lag(k)` means "start k elements later", like `itertools.islice(it, k, None)`.
+A `map` or `filter` applied to zipped values gets them as separate arguments,
+and zipping zipped values flattens them into one longer tuple.
+Branches that are zipped together must not have a `filter` between the zip
+and their common ancestor. Otherwise they would no longer advance in
+step, and the single loop couldn't line them up.
+"""
+
+import itertools
+from collections import deque
+
+import numpy as np
+
+
+class Pipeline:
+    """A node in a lazy pipeline graph. Build with `Pipeline.source()` and chain."""
+
+    __slots__ = ("kind", "parents", "arg")
+
+    def __init__(self, kind, parents, arg):
+        self.kind = kind
+        self.parents = parents
+        self.arg = arg
+
+    @classmethod
+    def source(cls):
+        return cls("source", (), None)
+
+    def map(self, func):
+        return Pipeline("map", (self,), func)
+
+    def filter(self, predicate):
+        return Pipeline("filter", (self,), predicate)
+
+    def lag(self, k=1):
+        if k < 1:
+            raise ValueError("k must be at least 1")
+        return Pipeline("lag", (self,), k)
+
+    def zip(self, *others):
+        return Pipeline("zip", (self,) + others, None)
+
+    def __repr__(self):
+        if self.kind == "source":
+            return "Pipeline.source()"
+        inner = ", ".join(map(repr, self.parents[1:]))
+        arg = self.arg if self.kind == "lag" else getattr(self.arg, "__name__", "")
+        return f"{self.parents[0]!r}.{self.kind}({inner or arg})"
+
+    # --- reference implementation: one CPython iterator per stage ---
+
+    def run_unfused(self, data):
+        """Chain of map/filter/zip/islice iterators, like the notebook builds by hand."""
+        if self.kind == "source":
+            return iter(data)
+        parents = [p.run_unfused(data) for p in self.parents]
+        starred = _yields_tuples(self.parents[0])
+        if self.kind == "map":
+            return itertools.starmap(self.arg, parents[0]) if starred else map(self.arg, parents[0])
+        if self.kind == "filter":
+            pred = (lambda values: self.arg(*values)) if starred else self.arg
+            return filter(pred, parents[0])
+        if self.kind == "lag":
+            return itertools.islice(parents[0], self.arg, None)
+        nested = [_yields_tuples(p) for p in self.parents]
+        if not any(nested):
+            return zip(*parents)
+        return (sum((v if t else (v,) for v, t in zip(values, nested)), ()) for values in zip(*parents))
+
+    # --- fused backends ---
+
+    def compile(self):
+        """Generate a single generator function `fused(data)` for the whole graph."""
+        return _ScalarCompiler(_analyse(self)).build()
+
+    def chunks(self, data, chunk_size=1 << 16):
+        """Evaluate the graph on numpy chunks of `data`, yielding output arrays."""
+        plan = _analyse(self)
+        yield from _run_chunks(plan, data, chunk_size)
+
+    def to_array(self, data, chunk_size=1 << 16):
+        parts = list(self.chunks(data, chunk_size))
+        return np.concatenate(parts) if parts else np.empty(0)
+
+
+def _yields_tuples(p):
+    if p.kind == "zip":
+        return True
+    return p.kind in ("filter", "lag") and _yields_tuples(p.parents[0])
+
+
+class _Node:
+    """A graph node after common-subexpression elimination, with alignment info."""
+
+    def __init__(self, index, kind, parents, arg):
+        self.index = index
+        self.kind = kind
+        self.parents = parents  # _Nodes
+        self.arg = arg
+        self.segment = 0  # the source or filter whose passing elements drive this node's ticks
+        self.lead = 0  # how many ticks this node's values run ahead of their position
+        self.width = 1  # number of values (zip produces several)
+
+
+def _analyse(output):
+    """Merge identical nodes and work out segments and leads. Returns nodes in topological order."""
+    nodes = []
+    canonical = {}  # structural key -> _Node
+    seen = {}  # id(Pipeline) -> _Node
+
+    def visit(p):
+        if id(p) in seen:
+            return seen[id(p)]
+        parents = tuple(visit(q) for q in p.parents)
+        arg_key = p.arg if p.kind == "lag" else id(p.arg)
+        key = (p.kind, arg_key, tuple(q.index for q in parents))
+        node = canonical.get(key)
+        if node is None:
+            node = _Node(len(nodes), p.kind, parents, p.arg)
+            _align(node)
+            canonical[key] = node
+            nodes.append(node)
+        seen[id(p)] = node
+        return node
+
+    visit(output)
+    return nodes
+
+
+def _align(node):
+    if node.kind == "source":
+        return
+    first = node.parents[0]
+    node.segment, node.lead, node.width = first.segment, first.lead, first.width
+    if node.kind == "map":
+        node.width = 1
+    elif node.kind == "filter":
+        node.segment = node.index
+        node.lead = 0
+    elif node.kind == "lag":
+        node.lead += node.arg
+    elif node.kind == "zip":
+        if len({p.segment for p in node.parents}) != 1:
+            raise ValueError("can't fuse a zip of branches separated by a filter; use run_unfused")
+        node.lead = max(p.lead for p in node.parents)
+        node.width = sum(p.width for p in node.parents)
+
+
+class _ScalarCompiler:
+    def __init__(self, nodes):
+        self.nodes = nodes
+        self.names = {}  # node index -> list of variable names holding its current value(s)
+        self.namespace = {"deque": deque}
+        self.setup = []
+        self.body = []
+        self.indent = 1
+
+    def emit(self, line):
+        self.body.append("    " * self.indent + line)
+
+    def guard(self, node):
+        # values are only meaningful once the node's segment has advanced past its lead
+        return f"t{node.segment} > {node.lead}" if node.lead else None
+
+    def build(self):
+        for node in self.nodes:
+            getattr(self, "_" + node.kind)(node)
+        out = self.nodes[-1]
+        names = self.names[out.index]
+        value = names[0] if len(names) == 1 else "(" + ", ".join(names) + ",)"
+        check = self.guard(out)
+        self.emit(f"if {check}: yield {value}" if check else f"yield {value}")
+        source = "\n".join(["def fused(data):"] + ["    " + s for s in self.setup] + self.body)
+        exec(compile(source, "<fused pipeline>", "exec"), self.namespace)
+        fused = self.namespace["fused"]
+        fused.source = source  # handy for seeing what was generated
+        return fused
+
+    def _source(self, node):
+        self.setup.append("t0 = 0")
+        self.emit("for v0 in data:")
+        self.indent += 1
+        self.emit("t0 += 1")
+        self.names[node.index] = ["v0"]
+
+    def _map(self, node):
+        i = node.index
+        self.namespace[f"f{i}"] = node.arg
+        call = f"f{i}({', '.join(self.names[node.parents[0].index])})"
+        check = self.guard(node)
+        self.emit(f"v{i} = {call} if {check} else None" if check else f"v{i} = {call}")
+        self.names[i] = [f"v{i}"]
+
+    def _filter(self, node):
+        i = node.index
+        parent = node.parents[0]
+        self.namespace[f"f{i}"] = node.arg
+        test = f"not f{i}({', '.join(self.names[parent.index])})"
+        check = self.guard(parent)
+        self.emit(f"if {'not ' + check + ' or ' if check else ''}{test}: continue")
+        self.setup.append(f"t{node.segment} = 0")
+        self.emit(f"t{node.segment} += 1")
+        self.names[i] = self.names[parent.index]
+
+    def _lag(self, node):
+        self.names[node.index] = self.names[node.parents[0].index]
+
+    def _zip(self, node):
+        names = []
+        for parent in node.parents:
+            delay = node.lead - parent.lead
+            for name in self.names[parent.index]:
+                if delay == 0:
+                    names.append(name)
+                    continue
+                buf = f"b{node.index}_{len(names)}"
+                self.setup.append(f"{buf} = deque([None] * {delay}, maxlen={delay + 1})")
+                self.emit(f"{buf}.append({name})")
+                self.emit(f"d{buf} = {buf}[0]")
+                names.append(f"d{buf}")
+        self.names[node.index] = names
+
+
+def _run_chunks(nodes, data, chunk_size):
+    ticks = {}  # segment -> ticks seen before the current chunk
+    carries = {}  # (zip index, position) -> the last `delay` values of that branch
+    out = nodes[-1]
+    for start in range(0, len(data), chunk_size):
+        values = {}
+        for node in nodes:
+            if node.kind == "source":
+                values[node.index] = [np.asarray(data[start:start + chunk_size])]
+                continue
+            parent_values = values[node.parents[0].index]
+            if node.kind == "map":
+                values[node.index] = [np.asarray(node.arg(*parent_values))]
+            elif node.kind == "lag":
+                values[node.index] = parent_values
+            elif node.kind == "filter":
+                seg = node.parents[0].segment
+                n = len(parent_values[0])
+                mask = np.asarray(node.arg(*parent_values), dtype=bool)
+                mask &= np.arange(ticks.get(seg, 0) + 1, ticks.get(seg, 0) + n + 1) > node.parents[0].lead
+                values[node.index] = [v[mask] for v in parent_values]
+            else:
+                values[node.index] = _align_chunk(node, values, carries)
+        # advance each segment's tick counter by the number of elements it saw in this chunk
+        for node in nodes:
+            if node.kind in ("source", "filter"):
+                ticks[node.segment] = ticks.get(node.segment, 0) + len(values[node.index][0])
+        result = values[out.index]
+        seen = ticks.get(out.segment, 0)
+        n = len(result[0])
+        drop = min(n, max(0, out.lead - (seen - n)))  # warm-up elements that aren't real values yet
+        result = [v[drop:] for v in result]
+        if len(result[0]):
+            yield result[0] if len(result) == 1 else np.stack(result, axis=-1)
+
+
+def _align_chunk(node, values, carries):
+    aligned = []
+    for parent in node.parents:
+        delay = node.lead - parent.lead
+        for array in values[parent.index]:
+            if delay == 0:
+                aligned.append(array)
+                continue
+            key = (node.index, len(aligned))
+            carry = carries.get(key)
+            if carry is None:
+                carry = np.zeros(delay, dtype=array.dtype)  # placeholders, dropped as warm-up
+            joined = np.concatenate((carry, array))
+            carries[key] = joined[len(array):]
+            aligned.append(joined[:len(array)])
+    return aligned
+
+
+if __name__ == "__main__":
+    # fused vs unfused on a big stream: python pipeline.py [n]
+    import sys
+    import time
+
+    n = int(float(sys.argv[1])) if len(sys.argv) > 1 else 10**7
+    data = np.random.default_rng(0).uniform(15, 110, n)
+
+    def celsius_converter(number):
+        return (number - 32) * (5 / 9)
+
+    celsius = Pipeline.source().map(celsius_converter)
+    pipelines = {
+        "hot_days": celsius.filter(lambda x: x > 25),
+        "temp_differences": celsius.zip(celsius.lag(1)).map(lambda today, tomorrow: tomorrow - today),
+    }
+    for name, pipeline in pipelines.items():
+        for label, run in (
+            ("unfused", lambda: sum(pipeline.run_unfused(data))),
+            ("fused", lambda: sum(pipeline.compile()(data))),
+            ("chunks", lambda: sum(chunk.sum() for chunk in pipeline.chunks(data))),
+        ):
+            start = time.perf_counter()
+            total = run()
+            print(f"{name:>16} {label:>8}: {time.perf_counter() - start:8.3f}s  (sum={total:.6g})")
@@ -0,0 +1,135 @@
+"""Lazy arithmetic sequences, with sums and friends in closed form.
+
+`range(1, 39, 2)` is lazy, but `sum(range(...))` still adds the numbers up one
+by one. `np.linspace(1, 5, num=5)` allows float steps, but it allocates every
+element straight away. An `ArithmeticSequence` is the start, the step and the
+number of terms, and nothing else:
+
+    ArithmeticSequence(1, 39, 2)                  # like range(1, 39, 2)
+    ArithmeticSequence.linspace(1, 5, num=5)      # like np.linspace(1, 5, num=5)
+    ArithmeticSequence(0, 10**12).sum()           # instant, no memory
+
+`len`, indexing, slicing, `in`, `sum`, `mean`, `min` and `max` are all worked
+out with a formula. Integer sequences give exact integer answers. Use
+`chunks()` when you need the actual numbers in numpy buffers.
+"""
+
+import math
+
+import numpy as np
+
+from cardinality import arithmetic_length
+
+
+class ArithmeticSequence:
+    """start, start + step, start + 2*step, ... stopping before `stop` (like range)."""
+
+    __slots__ = ("start", "step", "length")
+
+    def __init__(self, start, stop=None, step=1):
+        if stop is None:
+            start, stop = 0, start
+        self.start = start
+        self.step = step
+        self.length = arithmetic_length(start, stop, step)
+
+    @classmethod
+    def from_terms(cls, start, step, length):
+        seq = cls.__new__(cls)
+        seq.start, seq.step, seq.length = start, step, max(0, length)
+        return seq
+
+    @classmethod
+    def linspace(cls, start, stop, num=50, endpoint=True):
+        """The same numbers as np.linspace (up to rounding in the last digit), without allocating them."""
+        divisions = num - 1 if endpoint else num
+        step = (stop - start) / divisions if divisions > 0 else 0.0
+        return cls.from_terms(start, step, num)
+
+    # --- sequence protocol ---
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            positions = range(self.length)[index]
+            return self.from_terms(self.start + positions.start * self.step,
+                                   self.step * positions.step, len(positions))
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("ArithmeticSequence index out of range")
+        return self.start + index * self.step
+
+    def __iter__(self):
+        for i in range(self.length):
+            yield self.start + i * self.step
+
+    def __reversed__(self):
+        return iter(self[::-1])
+
+    def __contains__(self, value):
+        if self.length == 0:
+            return False
+        if self.step == 0:
+            return value == self.start
+        if all(isinstance(x, int) for x in (value, self.start, self.step)):
+            position, remainder = divmod(value - self.start, self.step)  # exact, unlike / above 2**53
+            return remainder == 0 and 0 <= position < self.length
+        nearest = round((value - self.start) / self.step)
+        if not 0 <= nearest < self.length:
+            return False
+        return math.isclose(self.start + nearest * self.step, value, rel_tol=1e-12, abs_tol=1e-12)
+
+    def __eq__(self, other):
+        if not isinstance(other, ArithmeticSequence):
+            return NotImplemented
+        if self.length != other.length:
+            return False
+        if self.length == 0:
+            return True
+        return self.start == other.start and (self.length == 1 or self.step == other.step)
+
+    def __hash__(self):
+        return hash((self.start, self.step if self.length > 1 else None, self.length))
+
+    def __repr__(self):
+        return f"ArithmeticSequence.from_terms(start={self.start!r}, step={self.step!r}, length={self.length})"
+
+    # --- closed forms ---
+
+    @property
+    def last(self):
+        return self[-1]
+
+    def sum(self):
+        n = self.length
+        # n*(n-1) is always even, so // keeps integer sequences exact
+        return n * self.start + self.step * (n * (n - 1) // 2)
+
+    def mean(self):
+        if self.length == 0:
+            return math.nan
+        return (self.start + self.last) / 2
+
+    def min(self):
+        if self.length == 0:
+            raise ValueError("min() of an empty sequence")
+        return min(self.start, self.last)
+
+    def max(self):
+        if self.length == 0:
+            raise ValueError("max() of an empty sequence")
+        return max(self.start, self.last)
+
+    # --- materialising on demand ---
+
+    def chunks(self, size=1 << 16):
+        """The terms as numpy arrays of at most `size` elements."""
+        for first in range(0, self.length, size):
+            yield self.start + self.step * np.arange(first, min(first + size, self.length))
+
+    def __array__(self, dtype=None, copy=None):
+        values = self.start + self.step * np.arange(self.length)
+        return values if dtype is None else values.astype(dtype)
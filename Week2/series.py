@@ -0,0 +1,186 @@
+"""Sums and products of many terms: accurately, without overflow, and of infinite series.
+
+The notebook's ∑ and ∏ are `sum(iter)` and `prod(iter)`. Three things go wrong
+once there are many terms:
+
+1. Float rounding errors pile up. `series_sum` adds each numpy chunk pairwise
+   while recovering every rounding error (TwoSum), and adds up the chunks with
+   Neumaier's compensated summation.
+2. Products overflow (or underflow) long before the answer is useless.
+   `log_prod` keeps the running product as a sign and a log-magnitude.
+3. An infinite series like 1/2 + 1/4 + 1/8 + ... can't be summed to the end.
+   `infinite_sum` stops when the sum has converged to a tolerance. It can also
+   *accelerate* the partial sums (Aitken's Δ², or Richardson extrapolation),
+   which often reaches the limit after a handful of terms instead of millions.
+
+    infinite_sum(1 / 2**i for i in itertools.count(1))   # SeriesResult(value=1.0, terms=4, converged=True)
+"""
+
+import itertools
+import math
+from collections import namedtuple
+
+import numpy as np
+
+SeriesResult = namedtuple("SeriesResult", "value terms converged")
+
+
+class NeumaierSum:
+    """A running sum that also keeps track of the rounding error it makes."""
+
+    __slots__ = ("total", "compensation")
+
+    def __init__(self):
+        self.total = 0.0
+        self.compensation = 0.0
+
+    def add(self, x):
+        t = self.total + x
+        if abs(self.total) >= abs(x):
+            self.compensation += (self.total - t) + x
+        else:
+            self.compensation += (x - t) + self.total
+        self.total = t
+
+    @property
+    def value(self):
+        return self.total + self.compensation
+
+
+def _chunks(values, chunk_size):
+    if isinstance(values, np.ndarray):
+        for start in range(0, len(values), chunk_size):
+            yield values[start:start + chunk_size]
+    elif hasattr(values, "chunks"):
+        yield from values.chunks()
+    else:
+        it = iter(values)
+        while True:
+            chunk = np.fromiter(itertools.islice(it, chunk_size), dtype=np.float64)
+            if len(chunk) == 0:
+                return
+            yield chunk
+
+
+def _compensated_chunk_sum(x, total):
+    """Add a chunk to `total` by summing neighbouring pairs, level by level, keeping every rounding error.
+
+    Each pairwise add s = a + b is exact up to an error that TwoSum recovers
+    with a few more (vectorised) operations. The errors are summed at the end.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    errors = 0.0
+    while len(x) > 1:
+        if len(x) % 2:
+            total.add(float(x[-1]))
+            x = x[:-1]
+        a, b = x[0::2], x[1::2]
+        s = a + b
+        b_virtual = s - a
+        errors += float(np.sum((a - (s - b_virtual)) + (b - b_virtual)))
+        x = s
+    if len(x):
+        total.add(float(x[0]))
+    total.add(errors)
+
+
+def series_sum(values, chunk_size=1 << 16):
+    """∑ values: vectorised compensated pairwise sums within numpy chunks, Neumaier across them."""
+    total = NeumaierSum()
+    for chunk in _chunks(values, chunk_size):
+        _compensated_chunk_sum(chunk, total)
+    return total.value
+
+
+def log_prod(values, chunk_size=1 << 16):
+    """∏ values as (sign, log|product|), so it can't overflow. sign is 0 if any value is 0."""
+    sign = 1
+    log_total = NeumaierSum()
+    for chunk in _chunks(values, chunk_size):
+        chunk = np.asarray(chunk, dtype=np.float64)
+        if np.any(chunk == 0):
+            return 0, -math.inf
+        if np.count_nonzero(chunk < 0) % 2:
+            sign = -sign
+        log_total.add(float(np.sum(np.log(np.abs(chunk)))))
+    return sign, log_total.value
+
+
+def series_prod(values, chunk_size=1 << 16):
+    """∏ values as a float (inf or 0 only if the true product really is out of float range)."""
+    sign, log_abs = log_prod(values, chunk_size)
+    if sign == 0:
+        return 0.0
+    try:
+        return sign * math.exp(log_abs)
+    except OverflowError:
+        return sign * math.inf
+
+
+def geometric_sum(first, ratio, terms=None):
+    """first + first*ratio + first*ratio**2 + ... (`terms` of them, or forever if None)."""
+    if terms is None:
+        if abs(ratio) >= 1:
+            raise ValueError("an infinite geometric series only converges for |ratio| < 1")
+        return first / (1 - ratio)
+    if ratio == 1:
+        return first * terms
+    return first * (1 - ratio**terms) / (1 - ratio)
+
+
+def _aitken(s0, s1, s2):
+    denominator = (s2 - s1) - (s1 - s0)
+    if denominator == 0:
+        return s2
+    return s2 - (s2 - s1) ** 2 / denominator
+
+
+def infinite_sum(terms, tol=1e-15, max_terms=10**7, accelerate="aitken"):
+    """Sum an (infinite) iterator of terms until the result stops changing.
+
+    `accelerate` is "aitken" (good for geometric-like series), "richardson"
+    (good for series whose tail shrinks like a power of 1/n, e.g. ∑ 1/i²), or
+    None (plain partial sums, stopping once the terms are negligible).
+    Returns a SeriesResult(value, terms used, converged). A finite iterator
+    that runs out first gives its exact sum; the extrapolated estimate is only
+    returned after `max_terms` terms.
+    """
+    if accelerate not in ("aitken", "richardson", None):
+        raise ValueError("accelerate must be 'aitken', 'richardson' or None")
+    partial = NeumaierSum()
+    recent = []  # the last three partial sums, for Aitken
+    estimate = None
+    table = []  # Richardson: one row per doubling of the number of terms
+    quiet = 0  # consecutive negligible terms, for the plain version
+    n = 0
+    for n, term in enumerate(itertools.islice(terms, max_terms), start=1):
+        partial.add(term)
+        s = partial.value
+        if accelerate == "aitken":
+            recent = (recent + [s])[-3:]
+            if len(recent) < 3:
+                continue
+            new = _aitken(*recent)
+            if estimate is not None and abs(new - estimate) <= tol * max(1.0, abs(new)):
+                return SeriesResult(new, n, True)
+            estimate = new
+        elif accelerate == "richardson":
+            if n & (n - 1):
+                continue  # only extrapolate at n = 1, 2, 4, 8, ...
+            row = [s]
+            for j, previous in enumerate(table[-1] if table else [], start=1):
+                row.append((2**j * row[j - 1] - previous) / (2**j - 1))
+            table.append(row)
+            if len(table) > 2 and abs(row[-1] - table[-2][-1]) <= tol * max(1.0, abs(row[-1])):
+                return SeriesResult(row[-1], n, True)
+        else:
+            quiet = quiet + 1 if abs(term) <= tol * max(1.0, abs(s)) else 0
+            if quiet >= 3:
+                return SeriesResult(s, n, True)
+    if n < max_terms:
+        return SeriesResult(partial.value, n, True)  # the iterator ran out: the sum is exact
+    if accelerate == "aitken" and estimate is not None:
+        return SeriesResult(estimate, n, False)
+    if accelerate == "richardson" and table:
+        return SeriesResult(table[-1][-1], n, False)
+    return SeriesResult(partial.value, n, False)
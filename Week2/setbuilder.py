@@ -0,0 +1,61 @@
+"""Set-builder notation, evaluated on whole numpy chunks.
+
+    C = {x^2 : x ∈ S; x > 3; x mod 2 = 1}
+
+is `{x*x for x in S if x%2==1 and x>3}` in Python, which checks the conditions
+one element at a time. `set_builder` takes the same three ingredients: a
+source, a list of conditions and a transformation:
+
+    set_builder(S, [lambda x: x % 2 == 1, lambda x: x > 3], lambda x: x * x)
+
+Each condition is a boolean mask over a whole chunk. It is only evaluated on the
+elements that passed the conditions before it, and a chunk where nothing
+survives is dropped straight away. Each chunk's results are sorted and
+deduplicated, then merged into the sorted set of everything found so far.
+
+The result is a sorted numpy array with no repeats: the set C.
+"""
+
+import numpy as np
+
+from chunked import ChunkedStream
+
+
+def sorted_unique(values):
+    """Like np.unique, by sorting and dropping neighbours that are equal (much faster than its hash path here)."""
+    values = np.sort(values)
+    keep = np.empty(len(values), dtype=bool)
+    keep[:1] = True
+    np.not_equal(values[1:], values[:-1], out=keep[1:])
+    if values.dtype.kind in "fc" and len(values) and np.isnan(values[-1]):
+        # NaN != NaN, so every NaN looked new; they're all sorted to the end, and np.unique keeps one
+        keep[int(np.argmax(np.isnan(values))) + 1:] = False
+    return values[keep]
+
+
+def merge_sorted_unique(a, b):
+    """The union of two sorted arrays without repeats, as another one."""
+    if len(a) == 0:
+        return b
+    new = b[~np.isin(b, a, assume_unique=True)]
+    if a.dtype.kind in "fc" and np.isnan(a[-1]):
+        new = new[~np.isnan(new)]  # a already has its NaN (isin never finds one)
+    return np.insert(a, np.searchsorted(a, new), new)
+
+
+def set_builder(source, predicates=(), transform=None, chunk_size=1 << 20):
+    """{transform(x) : x ∈ source; p(x) for every p in predicates}, as a sorted unique array.
+
+    `source` can be a numpy array, a `ColumnFile`, or any iterable (a Python
+    set is batched into chunks). Predicates and transform must be vectorised.
+    """
+    stream = ChunkedStream(source, chunk_size)
+    for predicate in predicates:
+        stream = stream.filter(predicate)
+    if transform is not None:
+        stream = stream.map(transform)
+    result = None
+    for chunk in stream.chunks():
+        values = sorted_unique(chunk)
+        result = values if result is None else merge_sorted_unique(result, values)
+    return result if result is not None else np.empty(0)
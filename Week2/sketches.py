@@ -0,0 +1,250 @@
+"""Small, mergeable summaries of huge streams: distinct counts, membership, frequencies.
+
+`{x*x for x in S if x%2==1 and x>3}` has to keep every distinct value in a
+Python set. For billions of keys, that doesn't fit. Sketches trade a little
+accuracy for a fixed, tiny memory footprint:
+
+- `HyperLogLog`: roughly how many distinct values (about 1.6% error in 4 KB).
+- `BloomFilter`: "have I seen this value?", with no false negatives and a
+  chosen rate of false positives.
+- `CountMinSketch`: roughly how many times each value appeared (never an
+  undercount).
+
+All three take any iterator the notebook builds (`update`), or whole numpy
+chunks at once (`update_array`). Sketches with the same settings built on
+different workers can be combined with `merge`.
+
+Values are hashed with a fixed 64-bit hash (not Python's `hash`, which is
+randomised per process), so sketches from different processes agree. Equal
+ints and floats (4 and 4.0) hash alike, like they do in a set.
+"""
+
+import hashlib
+import math
+import struct
+
+import numpy as np
+
+MASK64 = (1 << 64) - 1
+
+
+# --- hashing ---
+
+def _splitmix64(x):
+    x = (x + 0x9E3779B97F4A7C15) & MASK64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & MASK64
+    return x ^ (x >> 31)
+
+
+def _splitmix64_array(x):
+    x = x.astype(np.uint64) + np.uint64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def hash64(value):
+    """A 64-bit hash that is the same in every process."""
+    if isinstance(value, (bool, int, np.integer)):
+        return _splitmix64(int(value) & MASK64)
+    if isinstance(value, (float, np.floating)):
+        value = float(value)
+        if value.is_integer() and abs(value) < 2.0**63:
+            return _splitmix64(int(value) & MASK64)
+        return _splitmix64(struct.unpack("<Q", struct.pack("<d", value))[0])
+    if isinstance(value, str):
+        data = value.encode()
+    elif isinstance(value, bytes):
+        data = value
+    else:
+        data = repr(value).encode()
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+
+def hash64_array(values):
+    """`hash64` of every element of a numeric array, vectorised."""
+    values = np.asarray(values)
+    if values.dtype.kind in "biu":
+        return _splitmix64_array(values.astype(np.int64).view(np.uint64))
+    if values.dtype.kind == "f":
+        values = values.astype(np.float64)
+        integral = (values == np.trunc(values)) & (np.abs(values) < 2.0**63)
+        as_int = np.where(integral, values, 0).astype(np.int64).view(np.uint64)
+        return _splitmix64_array(np.where(integral, as_int, values.view(np.uint64)))
+    return np.fromiter((hash64(v) for v in values.tolist()), dtype=np.uint64, count=len(values))
+
+
+def _feed(sketch, values):
+    """Send numpy arrays/chunked sources through the vectorised path, anything else element by element."""
+    if isinstance(values, np.ndarray):
+        sketch.update_array(values)
+    elif hasattr(values, "chunks"):
+        for chunk in values.chunks():
+            sketch.update_array(chunk)
+    else:
+        for value in values:
+            sketch.add(value)
+    return sketch
+
+
+def _bit_length(x):
+    """int.bit_length of every element of a uint64 array."""
+    x = x.copy()
+    n = np.zeros(x.shape, dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        big = x >= np.uint64(1 << shift)
+        n[big] += shift
+        x[big] >>= np.uint64(shift)
+    return n + (x > 0)
+
+
+# --- the sketches ---
+
+class HyperLogLog:
+    """Estimates the number of distinct values seen, in 2**precision bytes."""
+
+    def __init__(self, precision=12):
+        if not 4 <= precision <= 18:
+            raise ValueError("precision must be between 4 and 18")
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def add(self, value):
+        h = hash64(value)
+        rest_bits = 64 - self.precision
+        index = h >> rest_bits
+        rank = rest_bits - (h & ((1 << rest_bits) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update_array(self, values):
+        h = hash64_array(values)
+        rest_bits = 64 - self.precision
+        index = (h >> np.uint64(rest_bits)).astype(np.intp)
+        rank = rest_bits - _bit_length(h & np.uint64((1 << rest_bits) - 1)) + 1
+        np.maximum.at(self.registers, index, rank.astype(np.uint8))
+
+    def update(self, values):
+        return _feed(self, values)
+
+    def estimate(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            return m * math.log(m / zeros)  # few values: linear counting is more accurate
+        return float(raw)
+
+    def __len__(self):
+        return round(self.estimate())
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError("can only merge HyperLogLogs with the same precision")
+        merged = HyperLogLog(self.precision)
+        merged.registers = np.maximum(self.registers, other.registers)
+        return merged
+
+
+class BloomFilter:
+    """Set membership with no false negatives and some false positives."""
+
+    def __init__(self, bits, hashes):
+        self.bits = bits
+        self.hashes = hashes
+        self.array = np.zeros((bits + 7) // 8, dtype=np.uint8)  # packed, 8 bits per byte
+
+    @classmethod
+    def for_capacity(cls, capacity, false_positive_rate=0.01):
+        """Sized so that after `capacity` distinct adds, false positives happen at about the given rate."""
+        bits = math.ceil(-capacity * math.log(false_positive_rate) / math.log(2) ** 2)
+        hashes = max(1, round(bits / capacity * math.log(2)))
+        return cls(bits, hashes)
+
+    def _positions(self, h):
+        # double hashing: k positions from the two halves of one 64-bit hash
+        h1, h2 = h & 0xFFFFFFFF, h >> 32
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    def _positions_array(self, h):
+        h1 = (h & np.uint64(0xFFFFFFFF)).astype(np.int64)
+        h2 = (h >> np.uint64(32)).astype(np.int64)
+        i = np.arange(self.hashes, dtype=np.int64)
+        return (h1[:, None] + i[None, :] * h2[:, None]) % self.bits
+
+    def _set(self, positions):
+        positions = np.asarray(positions)
+        np.bitwise_or.at(self.array, positions >> 3, (1 << (positions & 7)).astype(np.uint8))
+
+    def _test(self, positions):
+        positions = np.asarray(positions)
+        return (self.array[positions >> 3] >> (positions & 7)) & 1 == 1
+
+    def add(self, value):
+        self._set(self._positions(hash64(value)))
+
+    def update_array(self, values):
+        self._set(self._positions_array(hash64_array(values)).ravel())
+
+    def update(self, values):
+        return _feed(self, values)
+
+    def __contains__(self, value):
+        return bool(self._test(self._positions(hash64(value))).all())
+
+    def contains_array(self, values):
+        return self._test(self._positions_array(hash64_array(values))).all(axis=1)
+
+    def merge(self, other):
+        if (other.bits, other.hashes) != (self.bits, self.hashes):
+            raise ValueError("can only merge BloomFilters with the same size and number of hashes")
+        merged = BloomFilter(self.bits, self.hashes)
+        merged.array = self.array | other.array
+        return merged
+
+
+class CountMinSketch:
+    """Approximate counts of each value. Estimates are never below the true count."""
+
+    def __init__(self, width=2048, depth=5):
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width), dtype=np.int64)
+
+    @classmethod
+    def for_error(cls, epsilon=0.001, delta=0.01):
+        """Overcounts by at most epsilon * (total count), with probability at least 1 - delta."""
+        return cls(math.ceil(math.e / epsilon), math.ceil(math.log(1 / delta)))
+
+    def _columns(self, h):
+        h1, h2 = h & 0xFFFFFFFF, h >> 32
+        return [(h1 + i * h2) % self.width for i in range(self.depth)]
+
+    def _columns_array(self, h):
+        h1 = (h & np.uint64(0xFFFFFFFF)).astype(np.int64)
+        h2 = (h >> np.uint64(32)).astype(np.int64)
+        i = np.arange(self.depth, dtype=np.int64)
+        return (h1[None, :] + i[:, None] * h2[None, :]) % self.width
+
+    def add(self, value, count=1):
+        self.table[np.arange(self.depth), self._columns(hash64(value))] += count
+
+    def update_array(self, values):
+        columns = self._columns_array(hash64_array(values))
+        rows = np.broadcast_to(np.arange(self.depth)[:, None], columns.shape)
+        np.add.at(self.table, (rows, columns), 1)
+
+    def update(self, values):
+        return _feed(self, values)
+
+    def __getitem__(self, value):
+        return int(self.table[np.arange(self.depth), self._columns(hash64(value))].min())
+
+    def merge(self, other):
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError("can only merge CountMinSketches with the same width and depth")
+        merged = CountMinSketch(self.width, self.depth)
+        merged.table = self.table + other.table
+        return merged
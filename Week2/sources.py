@@ -0,0 +1,129 @@
+"""Data sources bigger than memory, backed by memory-mapped column files.
+
+A `ColumnFile` is one column of numbers stored as raw binary (`<name>.bin`)
+next to a small `<name>.json` that records its dtype and length. Opening it
+uses `np.memmap`, so nothing is read until it is used, and then only the pages
+that are touched. The operating system's page cache does the buffering, so a
+50 GB file can be streamed with bounded memory.
+
+It behaves like the arrays the notebook already uses:
+
+    temps = ColumnFile("temperatures_fahrenheit.bin")
+    map(celsius_converter, temps)               # iterate element by element
+    ChunkedStream(temps).map(celsius_converter) # or chunk by chunk (see chunked.py)
+
+CSV and JSON files are converted to column files once, with `convert_csv`
+and `convert_json`. CSV and JSON-lines files are converted in chunks, so they
+never have to fit in memory either.
+"""
+
+import json
+from pathlib import Path
+
+import numpy as np
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+
+class ColumnFile:
+    """A read-only, memory-mapped 1-d column. Iterable, sliceable and chunkable."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        meta = json.loads(self.path.with_suffix(".json").read_text())
+        self.dtype = np.dtype(meta["dtype"])
+        self.length = meta["length"]
+        if self.length:
+            self.array = np.memmap(self.path, dtype=self.dtype, mode="r", shape=(self.length,))
+        else:
+            self.array = np.empty(0, dtype=self.dtype)  # mmap can't map an empty file
+
+    @classmethod
+    def write(cls, path, chunks, dtype=np.float64):
+        """Write an iterable of arrays (or one array) as a column file, and open it."""
+        path = Path(path)
+        dtype = np.dtype(dtype)
+        if isinstance(chunks, np.ndarray):
+            chunks = [chunks]
+        length = 0
+        with open(path, "wb") as out:
+            for chunk in chunks:
+                chunk = np.ascontiguousarray(chunk, dtype=dtype)
+                out.write(chunk.tobytes())
+                length += len(chunk)
+        # the .json is written last, so a half-written column can't be opened by accident
+        path.with_suffix(".json").write_text(json.dumps({"dtype": dtype.str, "length": length}))
+        return cls(path)
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        return self.array[index]
+
+    def chunks(self, size=DEFAULT_CHUNK_SIZE):
+        for start in range(0, self.length, size):
+            yield self.array[start:start + size]
+
+    def __iter__(self):
+        for chunk in self.chunks():
+            yield from chunk.tolist()
+
+    def __array__(self, dtype=None, copy=None):
+        # copy=True (np.array's default) must give an independent array, not a view of this one
+        if dtype is None:
+            return self.array.copy() if copy else self.array
+        return self.array.astype(dtype, copy=bool(copy))
+
+    def __repr__(self):
+        return f"ColumnFile({str(self.path)!r}, dtype={self.dtype}, length={self.length})"
+
+
+def _write_columns(frames, out_dir, columns, dtype):
+    """Append each chunk (a DataFrame) to one .bin file per column."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    files, lengths = {}, {}
+    try:
+        for frame in frames:
+            for name in columns or frame.columns:
+                if name not in files:
+                    files[name] = open(out_dir / f"{name}.bin", "wb")
+                    lengths[name] = 0
+                values = frame[name].to_numpy(dtype=dtype, na_value=np.nan)
+                files[name].write(np.ascontiguousarray(values).tobytes())
+                lengths[name] += len(values)
+    finally:
+        for f in files.values():
+            f.close()
+    for name, length in lengths.items():
+        (out_dir / f"{name}.json").write_text(json.dumps({"dtype": np.dtype(dtype).str, "length": length}))
+    return {name: ColumnFile(out_dir / f"{name}.bin") for name in lengths}
+
+
+def convert_csv(csv_path, out_dir, columns=None, dtype=np.float64, chunksize=DEFAULT_CHUNK_SIZE):
+    """Convert numeric CSV columns to column files, streaming `chunksize` rows at a time."""
+    import pandas as pd  # only needed here, and slow to import (see startup.py)
+
+    frames = pd.read_csv(csv_path, usecols=columns, chunksize=chunksize)
+    return _write_columns(frames, out_dir, columns, dtype)
+
+
+def convert_json(json_path, out_dir, columns, dtype=np.float64, lines=False, chunksize=DEFAULT_CHUNK_SIZE):
+    """Convert numeric JSON columns to column files.
+
+    A JSON-lines file (`lines=True`) is streamed in chunks. A plain JSON array
+    has to be parsed in one go, so that only works for files that fit in memory.
+    """
+    import pandas as pd
+
+    if lines:
+        frames = pd.read_json(json_path, lines=True, chunksize=chunksize)
+    else:
+        frames = [pd.read_json(json_path)]
+    return _write_columns(frames, out_dir, columns, dtype)
+
+
+def open_columns(out_dir):
+    """Open every column file in a folder, as a dict name -> ColumnFile."""
+    return {p.stem: ColumnFile(p) for p in sorted(Path(out_dir).glob("*.bin"))}
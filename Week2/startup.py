@@ -0,0 +1,232 @@
+"""Start the notebook quickly: lazy imports, deferred cells, and a per-cell profile.
+
+- `lazy_import("pandas")` returns the module straight away, but only really
+  imports it (via `importlib.util.LazyLoader`) the first time one of its
+  attributes is used. Cells that never touch it never pay for it.
+- `deferred(load_cars)` is a stand-in that calls `load_cars()` the first time
+  it is used (indexed, iterated, asked for an attribute, or given to numpy),
+  then behaves like the result. A cell can show it inside `mo.lazy(...)`, so nothing is loaded
+  until that output scrolls into view.
+- `profile_app(app)` runs every cell of a marimo app, in dependency order, and
+  times it, with the time spent importing modules counted separately (like
+  `python -X importtime`, but per cell):
+
+    python startup.py Notebook2          # or: python startup.py Notebook2 --sort
+"""
+
+import asyncio
+import builtins
+import importlib
+import importlib.util
+import inspect
+import sys
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+from numpy.lib.mixins import NDArrayOperatorsMixin
+
+CellTiming = namedtuple("CellTiming", "label seconds import_seconds new_modules")
+
+
+# --- lazy imports ---
+
+def lazy_import(name):
+    """The module `name`, imported for real on first attribute access.
+
+    The stand-in goes into `sys.modules` straight away, so code that only checks
+    whether a module is imported (`"pandas" in sys.modules`) will see it too.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named {name!r}", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+def _resolve(value):
+    if isinstance(value, Deferred):
+        return value.get()
+    if isinstance(value, (list, tuple)):
+        return type(value)(_resolve(item) for item in value)
+    return value
+
+
+class Deferred(NDArrayOperatorsMixin):
+    """The result of `func()`, computed the first time it is needed.
+
+    It stands in for the value everywhere: attributes, indexing, iteration,
+    arithmetic and comparisons (`mpg[hp**2 > 10300]`), ufuncs and numpy
+    functions all work on the value, and give plain results. `get()` returns
+    the value itself, for code that checks its type.
+    """
+
+    __slots__ = ("_func", "_value", "_lock")
+
+    _MISSING = object()
+
+    def __init__(self, func):
+        self._func = func
+        self._value = Deferred._MISSING
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._value is not Deferred._MISSING
+
+    def get(self):
+        if self._value is Deferred._MISSING:
+            with self._lock:
+                if self._value is Deferred._MISSING:
+                    self._value = self._func()
+        return self._value
+
+    def __getattr__(self, name):
+        if name.startswith("__"):  # e.g. copy looking for __deepcopy__: not forwarded, so nothing is loaded
+            raise AttributeError(name)
+        return getattr(self.get(), name)
+
+    def __getitem__(self, key):
+        return self.get()[key]
+
+    def __iter__(self):
+        return iter(self.get())
+
+    def __len__(self):
+        return len(self.get())
+
+    def __array__(self, dtype=None, copy=None):
+        return np.array(self.get(), dtype=dtype, copy=True) if copy else np.asarray(self.get(), dtype=dtype)
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        if "out" in kwargs:
+            kwargs["out"] = _resolve(kwargs["out"])
+        return getattr(ufunc, method)(*_resolve(inputs), **kwargs)
+
+    def __array_function__(self, func, types, args, kwargs):
+        return func(*_resolve(args), **{name: _resolve(value) for name, value in kwargs.items()})
+
+    def __repr__(self):
+        if not self.loaded:
+            return f"Deferred({getattr(self._func, '__name__', self._func)!r}, not loaded yet)"
+        return repr(self._value)
+
+    def _repr_html_(self):
+        value = self.get()
+        return value._repr_html_() if hasattr(value, "_repr_html_") else None
+
+
+def deferred(func):
+    """A stand-in for `func()` that only calls it when the value is first used."""
+    return Deferred(func)
+
+
+# --- profiling ---
+
+class _ImportClock:
+    """Adds up the time spent in (outermost) import statements while it is installed."""
+
+    def __init__(self):
+        self.seconds = 0.0
+        self._depth = 0
+        self._original = None
+
+    def __enter__(self):
+        self._original = builtins.__import__
+
+        def timed_import(*args, **kwargs):
+            self._depth += 1
+            started = time.perf_counter()
+            try:
+                return self._original(*args, **kwargs)
+            finally:
+                self._depth -= 1
+                if self._depth == 0:
+                    self.seconds += time.perf_counter() - started
+
+        builtins.__import__ = timed_import
+        return self
+
+    def __exit__(self, *exc):
+        builtins.__import__ = self._original
+
+
+def _label(data):
+    if data.name and data.name != "_":
+        return data.name
+    for line in data.code.splitlines():
+        line = line.strip()
+        if line and not line.startswith(("@", "def ", "async def ", "#", "return")):
+            return line[:60]
+    return "(empty cell)"
+
+
+def _run_cell(cell, namespace):
+    result = cell.run(**{name: namespace[name] for name in cell.refs if name in namespace})
+    if inspect.isawaitable(result):
+        result = asyncio.run(result)
+    return result
+
+
+def profile_app(app):
+    """Run every cell of `app` once, in dependency order, timing each. Returns a list of CellTiming.
+
+    marimo has no public API for a notebook's cells, so this reads the private
+    `app._cell_manager` (as of marimo 0.25) and may need updating for later versions.
+    """
+    manager = getattr(app, "_cell_manager", None)
+    if manager is None or not hasattr(manager, "cell_data"):
+        raise RuntimeError("this version of marimo doesn't expose app._cell_manager.cell_data(); "
+                           "profile with `python -X importtime` instead")
+    pending = [data for data in manager.cell_data() if data.cell is not None]
+    defined = set().union(*(data.cell.defs for data in pending))  # refs also list builtins like print
+    namespace = {}
+    timings = []
+    while pending:
+        ready = [data for data in pending if data.cell.refs & defined <= namespace.keys()]
+        if not ready:
+            raise RuntimeError(f"{len(pending)} cells depend on each other in a cycle")
+        for data in ready:
+            modules_before = len(sys.modules)
+            with _ImportClock() as clock:
+                started = time.perf_counter()
+                _, defs = _run_cell(data.cell, namespace)
+                seconds = time.perf_counter() - started
+            namespace.update(defs)
+            timings.append(CellTiming(_label(data), seconds, clock.seconds, len(sys.modules) - modules_before))
+            pending.remove(data)
+    return timings
+
+
+def format_profile(timings, sort=False):
+    rows = sorted(timings, key=lambda t: -t.seconds) if sort else timings
+    lines = [f"{'ms':>9} {'import ms':>9} {'modules':>7}  cell"]
+    for t in rows:
+        lines.append(f"{t.seconds * 1e3:9.1f} {t.import_seconds * 1e3:9.1f} {t.new_modules:7d}  {t.label}")
+    total = sum(t.seconds for t in timings)
+    imports = sum(t.import_seconds for t in timings)
+    lines.append(f"{total * 1e3:9.1f} {imports * 1e3:9.1f} {'':7}  total for {len(timings)} cells")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    args = sys.argv[1:] if argv is None else argv
+    sort = "--sort" in args
+    names = [arg for arg in args if not arg.startswith("--")] or ["Notebook2"]
+    started = time.perf_counter()
+    with _ImportClock() as clock:
+        notebook = importlib.import_module(names[0])
+    print(f"importing {names[0]}: {(time.perf_counter() - started) * 1e3:.1f} ms "
+          f"({clock.seconds * 1e3:.1f} ms of it in imports)")
+    print(format_profile(profile_app(notebook.app), sort=sort))
+
+
+if __name__ == "__main__":
+    main()
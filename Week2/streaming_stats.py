@@ -0,0 +1,183 @@
+"""One-pass statistics over iterators.
+
+`np.std` and friends need a concrete array. The reducers here instead eat an
+iterator (e.g. `hot_days()` or `temp_differences()`) one element at a time and
+only ever hold a handful of numbers, so the stream is never allocated and is
+only walked once, however many statistics you ask for.
+"""
+
+import math
+
+
+class RunningStats:
+    """Count, mean, variance, min and max of a stream, via Welford's algorithm.
+
+    Two `RunningStats` built over different parts of a dataset can be combined
+    with `merge`, which is what makes them usable across chunks or workers.
+    """
+
+    __slots__ = ("count", "mean", "m2", "min", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # sum of squared deviations from the current mean
+        self.min = math.inf
+        self.max = -math.inf
+
+    def push(self, x):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+        if x < self.min:
+            self.min = x
+        if x > self.max:
+            self.max = x
+
+    def update(self, iterable):
+        for x in iterable:
+            self.push(x)
+        return self
+
+    def update_chunk(self, chunk):
+        """Fold a whole numpy array in at once (vectorised, then merged)."""
+        if len(chunk) == 0:
+            return self
+        other = RunningStats()
+        other.count = int(chunk.size)
+        other.mean = float(chunk.mean())
+        other.m2 = float(((chunk - other.mean) ** 2).sum())
+        other.min = float(chunk.min())
+        other.max = float(chunk.max())
+        merged = self.merge(other)
+        for name in self.__slots__:
+            setattr(self, name, getattr(merged, name))
+        return self
+
+    def merge(self, other):
+        """Combine two partial results (Chan et al.'s parallel update)."""
+        out = RunningStats()
+        out.count = self.count + other.count
+        if out.count == 0:
+            return out
+        delta = other.mean - self.mean
+        out.mean = self.mean + delta * other.count / out.count
+        out.m2 = self.m2 + other.m2 + delta**2 * self.count * other.count / out.count
+        out.min = min(self.min, other.min)
+        out.max = max(self.max, other.max)
+        return out
+
+    def var(self, ddof=0):
+        # ddof=0 by default, to agree with np.var / np.std
+        if self.count - ddof <= 0:
+            return math.nan
+        return self.m2 / (self.count - ddof)
+
+    def std(self, ddof=0):
+        return math.sqrt(self.var(ddof))
+
+    def __repr__(self):
+        return (f"RunningStats(count={self.count}, mean={self.mean:.6g}, "
+                f"std={self.std():.6g}, min={self.min}, max={self.max})")
+
+
+class P2Quantile:
+    """Streaming estimate of the p-quantile using the P² algorithm.
+
+    Keeps five markers instead of the data (Jain & Chlamtac, 1985), so memory
+    is constant. Exact for the first five values, an estimate after that.
+    """
+
+    __slots__ = ("p", "_q", "_n", "_desired", "_increment")
+
+    def __init__(self, p):
+        if not 0 < p < 1:
+            raise ValueError("p must be strictly between 0 and 1")
+        self.p = p
+        self._q = []  # marker heights
+        self._n = [0, 1, 2, 3, 4]  # marker positions
+        self._desired = [0, 2 * p, 4 * p, 2 + 2 * p, 4]
+        self._increment = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def push(self, x):
+        q, n = self._q, self._n
+        if len(q) < 5:
+            q.append(x)
+            q.sort()
+            return
+        # find the cell x falls in, stretching the extreme markers if needed
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]:
+                k += 1
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self._desired[i] += self._increment[i]
+        # nudge the three middle markers towards their desired positions
+        for i in (1, 2, 3):
+            d = self._desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                step = 1 if d > 0 else -1
+                candidate = self._parabolic(i, step)
+                if not q[i - 1] < candidate < q[i + 1]:
+                    candidate = q[i] + step * (q[i + step] - q[i]) / (n[i + step] - n[i])
+                q[i] = candidate
+                n[i] += step
+
+    def _parabolic(self, i, step):
+        q, n = self._q, self._n
+        return q[i] + step / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + step) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - step) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    def update(self, iterable):
+        for x in iterable:
+            self.push(x)
+        return self
+
+    @property
+    def value(self):
+        q = self._q
+        if not q:
+            return math.nan
+        if len(q) < 5:
+            # too few points for the markers: interpolate the sorted values, like np.quantile
+            pos = self.p * (len(q) - 1)
+            lo = int(pos)
+            hi = min(lo + 1, len(q) - 1)
+            return q[lo] + (q[hi] - q[lo]) * (pos - lo)
+        return q[2]
+
+
+def describe(iterable, quantiles=()):
+    """Count, mean, std, var, min, max (and any requested quantiles) in one pass.
+
+    describe(temp_differences(), quantiles=(0.5,)) replaces building the array
+    with np.fromiter just to call np.std on it.
+    """
+    stats = RunningStats()
+    sketches = [P2Quantile(p) for p in quantiles]
+    for x in iterable:
+        stats.push(x)
+        for sketch in sketches:
+            sketch.push(x)
+    out = {
+        "count": stats.count,
+        "mean": stats.mean if stats.count else math.nan,
+        "std": stats.std(),
+        "var": stats.var(),
+        "min": stats.min if stats.count else math.nan,
+        "max": stats.max if stats.count else math.nan,
+    }
+    for sketch in sketches:
+        out[f"q{sketch.p:g}"] = sketch.value
+    return out
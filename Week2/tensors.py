@@ -0,0 +1,62 @@
+"""Build n-tensors of any shape without a Python loop per element.
+
+The notebook builds `random_3d_array` with three nested list comprehensions,
+calling `np.random.random()` once per element. It then converts the nested
+lists with `np.array`, so for a moment there are two copies. The builders
+here fill the array directly:
+
+- `random_tensor(shape)`: one call to a `np.random.Generator`.
+- `from_function(f, shape)`: `f(i, j, k, ...)` of the Cartesian indices. The
+  indices are small broadcastable arrays (like `np.ogrid`), not n full index
+  arrays.
+- `from_iterator(it, shape)`: values taken from a lazy iterator, written chunk
+  by chunk into one preallocated array.
+"""
+
+import itertools
+
+import numpy as np
+
+
+def random_tensor(shape, rng=None, low=0.0, high=1.0, dtype=np.float64):
+    """A tensor of uniform random numbers in [low, high)."""
+    rng = np.random.default_rng(rng)
+    out = rng.random(shape, dtype=dtype)
+    if (low, high) != (0.0, 1.0):
+        out *= high - low
+        out += low
+    return out
+
+
+def from_function(func, shape, dtype=None):
+    """The tensor whose element [i, j, k, ...] is func(i, j, k, ...).
+
+    `func` is called once, with one index array per axis, shaped so that they
+    broadcast against each other (e.g. (3, 1, 1), (1, 4, 1) and (1, 1, 5)). It
+    must therefore be written with numpy operations, e.g.
+    `from_function(lambda i, j: i == j, (3, 3))` for the identity matrix.
+    """
+    indices = np.indices(shape, sparse=True)
+    values = np.asarray(func(*indices), dtype=dtype)
+    if values.shape == tuple(shape):
+        return values
+    # func may not depend on every index (or on any), so broadcast it up to the full shape
+    return np.array(np.broadcast_to(values, shape))
+
+
+def from_iterator(iterable, shape, dtype=np.float64, chunk_size=1 << 16):
+    """Fill a tensor of `shape` (in C order) from a lazy iterator.
+
+    Raises ValueError if the iterator runs out before the tensor is full.
+    Extra elements are left unconsumed.
+    """
+    out = np.empty(shape, dtype=dtype)
+    flat = out.reshape(-1)  # a view, so filling it fills out
+    it = iter(iterable)
+    for start in range(0, flat.size, chunk_size):
+        count = min(chunk_size, flat.size - start)
+        try:
+            flat[start:start + count] = np.fromiter(itertools.islice(it, count), dtype=dtype, count=count)
+        except ValueError:
+            raise ValueError(f"iterator ran out before filling a tensor of shape {tuple(shape)}") from None
+    return out
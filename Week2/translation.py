@@ -0,0 +1,128 @@
+"""Character mappings compiled into 256-entry lookup tables.
+
+    alphabet_dict = dict(zip(alphabet, sorted(alphabet, reverse=True)))
+    "".join(alphabet_dict.get(c, c) for c in text)
+
+does one hash lookup (and one Python step) per character. When keys and values
+are single bytes, latin-1 characters or ints below 256, the whole mapping fits
+in a table of 256 bytes, and a whole buffer is translated in one C-level call:
+
+    cipher = TranslationTable.from_zip(alphabet, sorted(alphabet, reverse=True))
+    cipher["b"]                          # "y", like alphabet_dict["b"]
+    cipher.translate("hello")            # "svool", in one str/bytes.translate call
+    cipher.translate(np_uint8_array)     # fancy indexing: table[array]
+    cipher.translate_file("big.log", "big.enc")
+
+Characters that aren't keys are left alone. A file is translated one byte at a
+time, so for UTF-8 text keep the keys and values ASCII: bytes above 127 (the
+pieces of multi-byte characters) then pass through unchanged.
+"""
+
+import numpy as np
+
+DEFAULT_CHUNK_SIZE = 1 << 24
+
+
+def _code(item):
+    """A key or value as an int in range(256)."""
+    if isinstance(item, (str, bytes, bytearray)):
+        if len(item) != 1:
+            raise ValueError(f"keys and values must be single characters, got {item!r}")
+        item = ord(item) if isinstance(item, str) else item[0]
+    item = int(item)
+    if not 0 <= item < 256:
+        raise ValueError(f"{item} doesn't fit in a 256-entry table")
+    return item
+
+
+class TranslationTable:
+    """A mapping between single characters (or bytes, or ints below 256), as a lookup table."""
+
+    def __init__(self, mapping):
+        self.table = np.arange(256, dtype=np.uint8)  # the identity: unmapped characters stay put
+        self.mapped = np.zeros(256, dtype=bool)
+        self._kind = str
+        for key, value in dict(mapping).items():
+            if isinstance(key, (bytes, bytearray, int, np.integer)):
+                self._kind = bytes
+            self.table[_code(key)] = _code(value)
+            self.mapped[_code(key)] = True
+        self.bytes_table = self.table.tobytes()  # for bytes.translate
+        self._str_table = {int(k): int(self.table[k]) for k in np.flatnonzero(self.mapped)}
+
+    @classmethod
+    def from_zip(cls, keys, values):
+        """The table version of dict(zip(keys, values))."""
+        return cls(zip(keys, values))
+
+    @property
+    def str_table(self):
+        """A table for str.translate (which also takes characters above 255)."""
+        return dict(self._str_table)
+
+    # --- dict-like access ---
+
+    def __getitem__(self, key):
+        code = _code(key)
+        if not self.mapped[code]:
+            raise KeyError(key)
+        value = int(self.table[code])
+        if isinstance(key, str):
+            return chr(value)
+        return bytes([value]) if isinstance(key, (bytes, bytearray)) else value
+
+    def __contains__(self, key):
+        try:
+            return bool(self.mapped[_code(key)])
+        except ValueError:
+            return False
+
+    def __len__(self):
+        return int(np.count_nonzero(self.mapped))
+
+    def keys(self):
+        codes = np.flatnonzero(self.mapped)
+        return [chr(c) for c in codes] if self._kind is str else codes.tolist()
+
+    def inverse(self):
+        """The table that undoes this one (the mapping must be one-to-one)."""
+        keys = np.flatnonzero(self.mapped)
+        values = self.table[keys]
+        if len(np.unique(values)) != len(values):
+            raise ValueError("the mapping isn't one-to-one, so it has no inverse")
+        if self._kind is str:
+            return TranslationTable.from_zip(map(chr, values), map(chr, keys))
+        return TranslationTable.from_zip(values.tolist(), keys.tolist())
+
+    # --- translating whole buffers ---
+
+    def translate(self, data):
+        """Map every character of a str, bytes-like object or integer array in one call."""
+        if isinstance(data, str):
+            if data.isascii():
+                return data.translate(self._str_table)  # CPython's fast path for ASCII text
+            try:
+                raw = data.encode("latin-1")
+            except UnicodeEncodeError:
+                return data.translate(self._str_table)  # characters above 255 are never keys
+            # str.translate is per character again for non-ASCII text; bytes.translate never is
+            return raw.translate(self.bytes_table).decode("latin-1")
+        if isinstance(data, (bytes, bytearray)):
+            return data.translate(self.bytes_table)
+        if isinstance(data, memoryview):
+            return bytes(data).translate(self.bytes_table)
+        data = np.asarray(data)
+        if data.dtype != np.uint8 and data.size and (data.min() < 0 or data.max() > 255):
+            raise ValueError("array values must be between 0 and 255")
+        return self.table[data]
+
+    def translate_file(self, source, destination, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Translate a file of any size into another, `chunk_size` bytes at a time. Returns the bytes written."""
+        written = 0
+        with open(source, "rb") as src, open(destination, "wb") as dst:
+            while chunk := src.read(chunk_size):
+                written += dst.write(chunk.translate(self.bytes_table))
+        return written
+
+    def __repr__(self):
+        return f"TranslationTable({len(self)} keys)"
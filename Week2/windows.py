@@ -0,0 +1,321 @@
+"""Lags, differences, rolling windows and exponential smoothing over streams.
+
+`temp_differences()` pairs each day with the next by running
+`celsius_iterator()` twice, so every temperature is converted twice, and it
+can't say "the 7-day rolling mean" or "the max over the last 30 days". The
+operators here read their source exactly once and keep only a window's worth
+of recent values:
+
+    lag(celsius_iterator(), 7)               # (a week ago, today) pairs
+    diff(celsius_iterator())                 # temp_differences(), one conversion per day
+    rolling(celsius_iterator(), 7, "mean")   # 7-day rolling mean
+    ewm(celsius_iterator(), alpha=0.1)       # exponentially weighted mean
+
+These work on any iterator, one element at a time, with a ring buffer (a deque
+with `maxlen`) of the last `window` values. Sums, means, variances, minima
+and maxima are updated in O(1) per element instead of re-reading the window.
+
+For numpy speed, `ChunkedStream(...).rolling(window, agg)` and `.ewm(alpha)`
+use `rolling_step` and `ewm_step` below. Each chunk is joined to the last
+`window - 1` values of the previous one, so results don't depend on where the
+chunks are cut. Sums and means come from a cumulative sum, and minima and
+maxima from the van Herk/Gil-Werman trick: both are O(n), whatever the window.
+Anything else (a callable, "median") is applied to a `sliding_window_view`.
+
+Like `lag`, a rolling window only produces output once it is full, so n values
+give n - window + 1 results. Variances are population variances (ddof=0), like
+`np.var`. A window holding a NaN gives NaN, like `np.mean` would, and the
+windows either side of it are unaffected.
+"""
+
+import math
+from collections import deque
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+AGGREGATES = ("sum", "mean", "var", "std", "min", "max", "median")
+
+
+def _check_window(window):
+    if window < 1:
+        raise ValueError("window must be at least 1")
+
+
+# --- one element at a time ---
+
+def lag(iterable, k=1, combine=None):
+    """(value k places earlier, value) pairs, or combine(earlier, later) of each."""
+    _check_window(k)
+    ring = deque(maxlen=k)
+    for value in iterable:
+        if len(ring) == k:
+            earlier = ring[0]
+            yield (earlier, value) if combine is None else combine(earlier, value)
+        ring.append(value)
+
+
+def diff(iterable, k=1):
+    """value - (value k places earlier): `temp_differences()` for k=1."""
+    return lag(iterable, k, lambda earlier, later: later - earlier)
+
+
+def rolling(iterable, window, agg="mean"):
+    """agg over each run of `window` consecutive values.
+
+    `agg` is one of "sum", "mean", "var", "std", "min", "max", "median", or a
+    function taking a numpy array of the window's values.
+    """
+    _check_window(window)
+    if agg in ("sum", "mean"):
+        return _rolling_sum(iterable, window, agg == "mean")
+    if agg in ("var", "std"):
+        return _rolling_var(iterable, window, agg == "std")
+    if agg in ("min", "max"):
+        return _rolling_extreme(iterable, window, agg == "max")
+    func = np.median if agg == "median" else agg
+    if not callable(func):
+        raise ValueError(f"agg must be one of {AGGREGATES} or a function")
+    return _rolling_apply(iterable, window, func)
+
+
+def _rolling_sum(iterable, window, mean):
+    ring = deque(maxlen=window)
+    nans = deque(maxlen=window)  # NaNs count as 0.0 in the total, and make their windows NaN
+    total = 0.0
+    missing = 0
+    for i, value in enumerate(iterable):
+        if len(ring) == window:
+            total -= ring[0]
+            missing -= nans[0]
+        is_nan = value != value
+        ring.append(0.0 if is_nan else value)
+        nans.append(is_nan)
+        total += ring[-1]
+        missing += is_nan
+        if i % window == window - 1:
+            total = math.fsum(ring)  # start afresh now and then, so rounding errors can't drift
+        if len(ring) == window:
+            yield math.nan if missing else (total / window if mean else total)
+
+
+def _rolling_var(iterable, window, std):
+    ring = deque(maxlen=window)
+    count, mean, m2 = 0, 0.0, 0.0  # over the values in the window that aren't NaN
+    for value in iterable:
+        if len(ring) == window:
+            old = ring[0]
+            if old == old:
+                # Welford's update, run backwards for the value leaving the window
+                count -= 1
+                if count == 0:
+                    mean, m2 = 0.0, 0.0
+                else:
+                    delta = old - mean
+                    mean -= delta / count
+                    m2 -= delta * (old - mean)
+        ring.append(value)
+        if value == value:
+            count += 1
+            delta = value - mean
+            mean += delta / count
+            m2 += delta * (value - mean)
+        if len(ring) == window:
+            if count < window:  # a NaN in the window
+                yield math.nan
+                continue
+            var = max(m2, 0.0) / window
+            yield math.sqrt(var) if std else var
+
+
+def _rolling_extreme(iterable, window, largest):
+    candidates = deque()  # (index, value), values strictly worse the further back they are
+    last_nan = -window  # a NaN makes every window holding it NaN, like np.max
+    for i, value in enumerate(iterable):
+        if value != value:
+            last_nan = i
+        else:
+            while candidates and (candidates[-1][1] <= value if largest else candidates[-1][1] >= value):
+                candidates.pop()
+            candidates.append((i, value))
+        if candidates and candidates[0][0] <= i - window:
+            candidates.popleft()
+        if i >= window - 1:
+            yield math.nan if last_nan > i - window else candidates[0][1]
+
+
+def _rolling_apply(iterable, window, func):
+    ring = deque(maxlen=window)
+    for value in iterable:
+        ring.append(value)
+        if len(ring) == window:
+            yield func(np.array(ring))
+
+
+def ewm(iterable, alpha):
+    """Exponentially weighted mean: y = (1 - alpha) * previous y + alpha * x, starting from the first x."""
+    if not 0 < alpha <= 1:
+        raise ValueError("alpha must be in (0, 1]")
+    smoothed = None
+    for value in iterable:
+        smoothed = value if smoothed is None else smoothed + alpha * (value - smoothed)
+        yield smoothed
+
+
+# --- whole numpy chunks at once ---
+
+def sliding_extreme(values, window, largest=True):
+    """The max (or min) of every window of a 1-d array, in O(n) (van Herk/Gil-Werman)."""
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values) - window + 1
+    if n <= 0:
+        return values[:0]
+    accumulate = np.maximum.accumulate if largest else np.minimum.accumulate
+    blocks = -(-len(values) // window)
+    padded = np.full(blocks * window, -np.inf if largest else np.inf)
+    padded[:len(values)] = values
+    padded = padded.reshape(blocks, window)
+    prefix = accumulate(padded, axis=1).ravel()  # extreme from the start of each block
+    suffix = accumulate(padded[:, ::-1], axis=1)[:, ::-1].ravel()  # extreme to the end of each block
+    # window [i, i + window) = the end of i's block + the start of the next one
+    return (np.maximum if largest else np.minimum)(suffix[:n], prefix[window - 1:window - 1 + n])
+
+
+def _window_sums(values, window, shift):
+    totals = np.empty(len(values) + 1)
+    totals[0] = 0.0
+    np.cumsum(values - shift, out=totals[1:])
+    return totals[window:] - totals[:-window]
+
+
+def rolling_chunk(values, window, agg="mean"):
+    """agg over every full window of one 1-d array (n - window + 1 results)."""
+    values = np.asarray(values)
+    if len(values) < window:
+        return np.empty(0)
+    if agg in ("sum", "mean", "var", "std"):
+        # a NaN would poison the whole cumulative sum: sum with NaNs as zeros (around the mean of the rest,
+        # which keeps the cumulative sum small so differences of it stay accurate), then put NaN back
+        # in just the windows that hold one
+        missing = np.isnan(values) if values.dtype.kind in "fc" else None
+        if missing is not None and missing.any():
+            shift = float(np.mean(values, where=~missing)) if not missing.all() else 0.0
+            values = np.where(missing, shift, values)
+            has_nan = _window_sums(missing.astype(np.float64), window, 0.0) > 0.5
+        else:
+            shift = float(values.mean())
+            has_nan = None
+        if agg in ("sum", "mean"):
+            result = _window_sums(values, window, shift) + window * shift
+            if agg == "mean":
+                result /= window
+        else:
+            s1 = _window_sums(values, window, shift)
+            s2 = _window_sums((values - shift) ** 2, window, 0.0)
+            var = np.maximum(s2 - s1 * s1 / window, 0.0) / window if window > 1 else np.zeros(len(s1))
+            result = np.sqrt(var) if agg == "std" else var
+        if has_nan is not None:
+            result[has_nan] = np.nan
+        return result
+    if agg in ("min", "max"):
+        return sliding_extreme(values, window, largest=agg == "max")
+    windows = sliding_window_view(values, window)
+    if agg == "median":
+        return np.median(windows, axis=-1)
+    if callable(agg):
+        return np.asarray(agg(windows, axis=-1))
+    raise ValueError(f"agg must be one of {AGGREGATES} or a function")
+
+
+class _RollingStep:
+    def __init__(self, window, agg):
+        self.window = window
+        self.agg = agg
+        self.tail = None  # the last window - 1 values seen so far
+
+    def __call__(self, chunk):
+        window = self.window
+        joined = chunk if self.tail is None else np.concatenate((self.tail, chunk))
+        # chunks shorter than the window: keep all of them, until there are window - 1 values to carry
+        self.tail = joined[max(0, len(joined) - (window - 1)):].copy() if window > 1 else joined[:0]
+        return rolling_chunk(joined, window, self.agg)
+
+
+def rolling_step(window, agg="mean"):
+    """A chunk -> chunk function for `ChunkedStream`, carrying `window - 1` values between chunks.
+
+    A callable `agg` is called as agg(windows, axis=-1) on a sliding_window_view
+    of the chunk, like np.mean or np.percentile (with functools.partial).
+    """
+    _check_window(window)
+    if agg not in AGGREGATES and not callable(agg):
+        raise ValueError(f"agg must be one of {AGGREGATES} or a function")
+    return _RollingStep(window, agg)
+
+
+def ewm_chunk(values, alpha, start=None):
+    """The exponentially weighted mean of a 1-d array, vectorised, carrying on from `start`.
+
+    With beta = 1 - alpha, y[t] = beta**(t+1) * start + alpha * beta**t * sum(x[s] / beta**s).
+    beta**-s grows, so the array is done in blocks short enough for it not to overflow.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) == 0:
+        return values
+    if start is None:
+        start = values[0]
+    beta = 1.0 - alpha
+    if beta == 0.0:
+        return values.copy()
+    block = max(1, int(300 / -math.log(beta)))  # beta**-block stays below about 1e130
+    out = np.empty_like(values)
+    for first in range(0, len(values), block):
+        x = values[first:first + block]
+        powers = beta ** np.arange(len(x))
+        out[first:first + len(x)] = beta * powers * start + alpha * powers * np.cumsum(x / powers)
+        start = out[first + len(x) - 1]
+    return out
+
+
+class _EwmStep:
+    def __init__(self, alpha):
+        self.alpha = alpha
+        self.last = None  # the last smoothed value
+
+    def __call__(self, chunk):
+        smoothed = ewm_chunk(chunk, self.alpha, self.last)
+        if len(smoothed):
+            self.last = smoothed[-1]
+        return smoothed
+
+
+def ewm_step(alpha):
+    """A chunk -> chunk function for `ChunkedStream`, carrying the last smoothed value between chunks."""
+    if not 0 < alpha <= 1:
+        raise ValueError("alpha must be in (0, 1]")
+    return _EwmStep(alpha)
+
+
+if __name__ == "__main__":
+    # the chunked steps must agree with the one-element-at-a-time generators, wherever the chunks are cut
+    # (including chunks shorter than the window): python windows.py
+    from chunked import ChunkedStream
+
+    values = np.random.default_rng(0).normal(20, 5, 5000)
+    gappy = values.copy()  # a sensor that drops out now and then: windows holding a NaN are NaN
+    gappy[[3, 500, 501, 2000, 4999]] = np.nan
+    for data in (values, gappy):
+        for window in (1, 7, 30):
+            for agg in ("sum", "mean", "std", "max", "min", "median"):
+                expected = np.fromiter(rolling(data, window, agg), dtype=np.float64)
+                for chunk_size in (1, 7, 16, 20, 29, 30, 1000):
+                    got = ChunkedStream(data, chunk_size=chunk_size).rolling(window, agg).to_array()
+                    if len(got) != len(expected) or not np.allclose(got, expected, equal_nan=True):
+                        raise SystemExit(f"rolling({window}, {agg!r}) with chunk_size={chunk_size}"
+                                         f"{' and NaNs' if data is gappy else ''}: "
+                                         f"{len(got)} results, expected {len(expected)}")
+    expected = np.fromiter(ewm(values, 0.1), dtype=np.float64)
+    for chunk_size in (1, 7, 1000):
+        if not np.allclose(ChunkedStream(values, chunk_size=chunk_size).ewm(0.1).to_array(), expected):
+            raise SystemExit(f"ewm(0.1) with chunk_size={chunk_size} doesn't match")
+    print("chunked rolling and ewm match the per-element versions")